@@ -0,0 +1,250 @@
+"""Benchmarks for the returns and analytics pipeline on synthetic data.
+
+Each stage is timed over a grid of ticker counts and history lengths, with
+no network access (fetching goes through a stub backend). Results are
+written as JSON lines, one record per (stage, tickers, years)::
+
+    python benchmarks/pipeline.py --tickers 10 100 --years 1 5 -o base.jsonl
+    python benchmarks/pipeline.py --compare base.jsonl new.jsonl
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from marketdata.analytics import bucketed_corr, risk_report  # noqa: E402
+from marketdata.export import export_reports  # noqa: E402
+from marketdata.fetch import StubBackend, fetch_prices  # noqa: E402
+from marketdata.groupby import fused_agg  # noqa: E402
+from marketdata.reshape import LongView, to_wide  # noqa: E402
+from marketdata.returns import total_returns  # noqa: E402
+
+DAYS_PER_YEAR = 252
+
+
+def synthetic_universe(n_tickers, years, seed=0):
+    """Build random-walk prices and quarterly dividends.
+
+    Returns ``(prices, dividends)``: a dates x tickers frame where a tenth
+    of the tickers start part-way through the history, and a long
+    ``date``/``ticker``/``amount`` event table for every third ticker.
+    """
+    rng = np.random.RandomState(seed)
+    n_days = max(2, int(years * DAYS_PER_YEAR))
+    dates = pd.bdate_range(end='2016-12-30', periods=n_days, name='Date')
+    tickers = ['T{:05d}'.format(i) for i in range(n_tickers)]
+    steps = rng.normal(0.0003, 0.01, size=(n_days, n_tickers))
+    prices = 50.0 * np.exp(np.cumsum(steps, axis=0))
+    late = rng.rand(n_tickers) < 0.1
+    starts = rng.randint(0, n_days // 2 + 1, size=n_tickers)
+    for j in np.flatnonzero(late):
+        prices[:starts[j], j] = np.nan
+    prices = pd.DataFrame(prices, index=dates, columns=tickers)
+
+    ex_rows = np.arange(40, n_days, 63)
+    payers = tickers[::3]
+    dividends = pd.DataFrame({
+        'date': np.repeat(dates[ex_rows].values, len(payers)),
+        'ticker': np.tile(payers, len(ex_rows)),
+        'amount': rng.uniform(0.05, 0.5, size=len(ex_rows) * len(payers)),
+    })
+    return prices, dividends
+
+
+def _long(prices):
+    wide = prices.reset_index()
+    return pd.melt(wide, id_vars='Date', var_name='Index',
+                   value_name='Value').set_index(['Index', 'Date'])
+
+
+class Context(object):
+    """Lazily built inputs shared by the stages of one grid point."""
+
+    def __init__(self, n_tickers, years, workdir):
+        self.n_tickers = n_tickers
+        self.years = years
+        self.workdir = workdir
+        self.prices, self.dividends = synthetic_universe(n_tickers, years)
+        self._cache = {}
+
+    def get(self, name, build):
+        if name not in self._cache:
+            self._cache[name] = build()
+        return self._cache[name]
+
+    @property
+    def returns(self):
+        return self.get('returns',
+                        lambda: total_returns(self.prices, self.dividends))
+
+    @property
+    def long(self):
+        def build():
+            data = _long(self.prices)
+            data['Returns'] = data.groupby(level='Index')['Value'].pct_change()
+            return data
+        return self.get('long', build)
+
+
+def stage_fetch(ctx):
+    frames = {sym: ctx.prices[[sym]].rename(columns={sym: 'Close'})
+              for sym in ctx.prices.columns}
+    backend = StubBackend(frames)
+    start, end = ctx.prices.index[0], ctx.prices.index[-1]
+    return lambda: fetch_prices(list(frames), start, end, backend=backend)
+
+
+def stage_total_return(ctx):
+    return lambda: total_returns(ctx.prices, ctx.dividends)
+
+
+def stage_melt_pivot(ctx):
+    def run():
+        return _long(ctx.prices)['Value'].unstack(0)
+    return run
+
+
+def stage_long_view(ctx):
+    def run():
+        return to_wide(LongView(ctx.prices).to_frame())
+    return run
+
+
+def stage_groupby_agg(ctx):
+    data = ctx.long
+    return lambda: data.groupby(level='Index').agg(
+        {'Returns': ['min', 'max', 'std', 'mean'], 'Value': 'mean'})
+
+
+def stage_fused_agg(ctx):
+    data = ctx.long
+    return lambda: fused_agg(data.groupby(level='Index'), {
+        'Returns': ['min', 'max', 'std', 'mean'], 'Value': 'mean'})
+
+
+def stage_yearly_corrwith(ctx):
+    returns = ctx.returns
+    bench = returns.columns[0]
+    return lambda: returns.groupby(lambda x: x.year).apply(
+        lambda g: g.corrwith(g[bench]))
+
+
+def stage_bucketed_corr(ctx):
+    returns = ctx.returns
+    return lambda: bucketed_corr(returns, returns.columns[0], 'year')
+
+
+def stage_risk_report(ctx):
+    returns = ctx.returns
+    return lambda: risk_report(returns)
+
+
+def stage_export(ctx):
+    path = os.path.join(ctx.workdir, 'report.xlsx')
+    returns = ctx.returns
+    return lambda: export_reports({'returns': returns,
+                                   'dividends': ctx.dividends}, path)
+
+
+STAGES = {
+    'fetch': stage_fetch,
+    'total_return': stage_total_return,
+    'melt_pivot': stage_melt_pivot,
+    'long_view': stage_long_view,
+    'groupby_agg': stage_groupby_agg,
+    'fused_agg': stage_fused_agg,
+    'yearly_corrwith': stage_yearly_corrwith,
+    'bucketed_corr': stage_bucketed_corr,
+    'risk_report': stage_risk_report,
+    'export': stage_export,
+}
+
+
+def time_call(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def run(stages, tickers, years, repeat=3, max_cells=None, out=sys.stdout):
+    env = {'python': platform.python_version(), 'pandas': pd.__version__,
+           'numpy': np.__version__, 'machine': platform.machine()}
+    workdir = tempfile.mkdtemp(prefix='mdbench-')
+    try:
+        for n in tickers:
+            for y in years:
+                cells = n * y * DAYS_PER_YEAR
+                if max_cells and cells > max_cells:
+                    continue
+                ctx = Context(n, y, workdir)
+                for name in stages:
+                    func = STAGES[name](ctx)
+                    timings = time_call(func, repeat)
+                    record = dict(env, stage=name, tickers=n, years=y,
+                                  rows=len(ctx.prices), repeat=repeat,
+                                  best=min(timings),
+                                  median=float(np.median(timings)))
+                    out.write(json.dumps(record) + '\n')
+                    out.flush()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def _load(path):
+    with open(path) as fh:
+        records = [json.loads(line) for line in fh if line.strip()]
+    return {(r['stage'], r['tickers'], r['years']): r for r in records}
+
+
+def compare(base_path, new_path):
+    """Print best-time ratios (new / base) for grid points in both files."""
+    base, new = _load(base_path), _load(new_path)
+    print('{:<16} {:>8} {:>6} {:>12} {:>12} {:>8}'.format(
+        'stage', 'tickers', 'years', 'base', 'new', 'ratio'))
+    for key in sorted(set(base) & set(new)):
+        b, n = base[key]['best'], new[key]['best']
+        print('{:<16} {:>8} {:>6} {:>12.6f} {:>12.6f} {:>8.2f}'.format(
+            key[0], key[1], key[2], b, n, n / b if b else float('nan')))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--stages', nargs='+', choices=sorted(STAGES),
+                        default=list(STAGES))
+    parser.add_argument('--tickers', nargs='+', type=int,
+                        default=[10, 100, 1000, 10000])
+    parser.add_argument('--years', nargs='+', type=float,
+                        default=[1, 5, 10, 30])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--max-cells', type=int,
+                        help='skip grid points with more price cells')
+    parser.add_argument('-o', '--output', help='JSON lines file (default '
+                        'stdout)')
+    parser.add_argument('--compare', nargs=2, metavar=('BASE', 'NEW'))
+    args = parser.parse_args(argv)
+    if args.compare:
+        compare(*args.compare)
+        return
+    out = open(args.output, 'w') if args.output else sys.stdout
+    try:
+        run(args.stages, args.tickers, args.years, repeat=args.repeat,
+            max_cells=args.max_cells, out=out)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+
+if __name__ == '__main__':
+    main()
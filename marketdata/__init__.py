@@ -0,0 +1,85 @@
+"""Market data helpers for the notebooks in this repository.
+
+Fetching, caching and transforming the price matrices that the notebooks
+build with ``web.DataReader``::
+
+    import marketdata as md
+    spy = md.get_px('SPY', '2007-01-01', '2015-01-01')
+    ret = md.total_returns(md.fetch_prices(tickers, start, end),
+                           md.fetch_dividends(tickers, start, end)[0])
+
+Submodules are imported on first attribute access, and heavy optional
+dependencies (pandas_datareader, xlsxwriter, openpyxl) only when a function
+needs them, so ``import marketdata`` is cheap.
+"""
+import importlib
+
+_EXPORTS = {
+    'bucketed_corr': 'analytics',
+    'risk_report': 'analytics',
+    'PriceCache': 'cache',
+    'concat_stream': 'concat',
+    'fetch_dividends': 'dividends',
+    'take_dividends': 'dividends',
+    'export_reports': 'export',
+    'ErrorReport': 'fetch',
+    'FetchError': 'fetch',
+    'StubBackend': 'fetch',
+    'YahooBackend': 'fetch',
+    'fetch_prices': 'fetch',
+    'get_px': 'fetch',
+    'GroupPlan': 'groupby',
+    'calendar_reduce': 'groupby',
+    'fused_agg': 'groupby',
+    'group_codes': 'groupby',
+    'group_plan': 'groupby',
+    'grouped_diff': 'groupby',
+    'grouped_every': 'groupby',
+    'grouped_head': 'groupby',
+    'grouped_nth': 'groupby',
+    'grouped_pct_change': 'groupby',
+    'grouped_returns': 'groupby',
+    'grouped_shift': 'groupby',
+    'grouped_tail': 'groupby',
+    'positional_mask': 'groupby',
+    'weighted_agg': 'groupby',
+    'AlignPlan': 'join',
+    'align_plan': 'join',
+    'aligned_op': 'join',
+    'join_indexers': 'join',
+    'ordered_align': 'join',
+    'ordered_join': 'join',
+    'map_categorical': 'mapping',
+    'OnlineCovariance': 'online',
+    'parallel_apply': 'parallel',
+    'CalendarKey': 'periods',
+    'bucket_codes': 'periods',
+    'LongView': 'reshape',
+    'long_view': 'reshape',
+    'to_wide': 'reshape',
+    'total_returns': 'returns',
+    'read_excel_cached': 'sheets',
+    'append_rows': 'store',
+    'matrix_info': 'store',
+    'read_matrix': 'store',
+    'write_matrix': 'store',
+    'build_returns': 'update',
+    'update_returns': 'update',
+}
+
+__all__ = sorted(_EXPORTS)
+
+
+def __getattr__(name):
+    try:
+        module = _EXPORTS[name]
+    except KeyError:
+        raise AttributeError('module {!r} has no attribute {!r}'
+                             .format(__name__, name))
+    value = getattr(importlib.import_module('marketdata.' + module), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_EXPORTS))
@@ -0,0 +1,90 @@
+"""Command line entry point: ``python -m marketdata <command> ...``.
+
+Commands only import the modules they use, so reading a store does not pay
+for the fetch or export dependencies.
+"""
+import argparse
+import sys
+
+
+def _show(args):
+    from marketdata.store import read_matrix
+    columns = args.columns.split(',') if args.columns else None
+    df = read_matrix(args.store, columns=columns, start=args.start,
+                     end=args.end)
+    if args.tail:
+        df = df.tail(args.tail)
+    df.to_csv(sys.stdout)
+
+
+def _info(args):
+    from marketdata.store import matrix_info, read_matrix
+    info = matrix_info(args.store)
+    df = read_matrix(args.store)
+    span = ('{:%Y-%m-%d} .. {:%Y-%m-%d}'.format(df.index[0], df.index[-1])
+            if len(df) else 'empty')
+    print('rows: {}\ncolumns: {}\ndates: {}'.format(
+        info['rows'], len(info['columns']), span))
+
+
+def _update(args):
+    from marketdata.update import update_returns
+    kwargs = {}
+    if args.cache:
+        from marketdata.cache import PriceCache
+        kwargs['cache'] = PriceCache(args.cache)
+    result = update_returns(args.prices, args.returns, args.end,
+                            field=args.field, **kwargs)
+    print('appended {} row(s)'.format(result['rows']))
+    if result['errors']:
+        print(result['errors'].to_frame().to_string(index=False),
+              file=sys.stderr)
+
+
+def _export(args):
+    from marketdata.export import export_reports
+    from marketdata.store import read_matrix
+    reports = {name: read_matrix(path)
+               for name, path in (item.split('=', 1) for item in args.reports)}
+    stats = export_reports(reports, args.output, fmt=args.format)
+    print('{rows} rows in {seconds:.2f}s ({rows_per_sec:.0f} rows/s)'
+          .format(**stats))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m marketdata')
+    sub = parser.add_subparsers(dest='command')
+    sub.required = True
+
+    p = sub.add_parser('show', help='print a stored matrix as CSV')
+    p.add_argument('store')
+    p.add_argument('--columns', help='comma-separated tickers')
+    p.add_argument('--start')
+    p.add_argument('--end')
+    p.add_argument('--tail', type=int)
+    p.set_defaults(func=_show)
+
+    p = sub.add_parser('info', help='summarise a stored matrix')
+    p.add_argument('store')
+    p.set_defaults(func=_info)
+
+    p = sub.add_parser('update', help='append new dates to the stores')
+    p.add_argument('prices')
+    p.add_argument('returns')
+    p.add_argument('end')
+    p.add_argument('--field', default='Close')
+    p.add_argument('--cache', help='price cache directory')
+    p.set_defaults(func=_update)
+
+    p = sub.add_parser('export', help='export stores as one report')
+    p.add_argument('output')
+    p.add_argument('reports', nargs='+', metavar='NAME=STORE')
+    p.add_argument('--format', choices=['xlsx', 'csv', 'binary'])
+    p.set_defaults(func=_export)
+
+    args = parser.parse_args(argv)
+    args.func(args)
+
+
+if __name__ == '__main__':
+    main()
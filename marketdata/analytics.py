@@ -0,0 +1,202 @@
+"""Vectorised analytics over the wide returns matrix.
+
+The notebooks compute yearly correlations against SPY with::
+
+    data11.groupby(lambda x: x.year).apply(lambda g: g.corrwith(g['SPY']))
+
+which calls a lambda per timestamp and a full ``corrwith`` per group.
+:func:`bucketed_corr` computes every bucket's correlation for every column
+in one pass over per-bucket sums. :func:`risk_report` replaces the
+per-ticker ``apply`` calls for performance and risk statistics.
+"""
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from marketdata.periods import bucket_codes
+
+
+def _bucket_sums(arr, starts):
+    return np.add.reduceat(arr, starts, axis=0)
+
+
+def bucketed_corr(returns, benchmark, freq='year', min_periods=2,
+                  chunksize=512, fiscal_start=1):
+    """Correlate every column with a benchmark within calendar buckets.
+
+    Equivalent to ``returns.groupby(<bucket>).apply(lambda g:
+    g.corrwith(g[benchmark]))``: each correlation uses the rows of the
+    bucket where both the column and the benchmark are present.
+
+    Parameters
+    ----------
+    returns : DataFrame
+        Date-indexed returns.
+    benchmark : str or Series
+        Column of ``returns``, or a Series aligned on its index.
+    freq : str, default 'year'
+        Any frequency accepted by :func:`~marketdata.periods.bucket_codes`.
+    min_periods : int, default 2
+        Buckets with fewer paired observations give NaN.
+    chunksize : int, default 512
+        Columns processed at a time, bounding temporary memory.
+    fiscal_start : int, default 1
+        First month of the fiscal year, for ``freq='fiscal_year'``.
+
+    Returns
+    -------
+    DataFrame
+        Buckets x columns.
+    """
+    if isinstance(benchmark, pd.Series):
+        y = benchmark.reindex(returns.index)
+    else:
+        y = returns[benchmark]
+    if not returns.index.is_monotonic_increasing:
+        order = np.argsort(np.asarray(returns.index), kind='stable')
+        returns = returns.take(order)
+        y = y.take(order)
+    codes, labels = bucket_codes(returns.index, freq, fiscal_start)
+    out = np.empty((returns.shape[1], len(labels))).T
+    if not len(returns):
+        return pd.DataFrame(out, index=labels, columns=returns.columns)
+    starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]])
+
+    y = np.asarray(y, dtype=np.float64)
+    y_valid = ~np.isnan(y)
+    # Shifting by a constant leaves correlations unchanged and keeps the
+    # sums of squares well conditioned.
+    y = np.where(y_valid, y - np.nanmean(y) if y_valid.any() else 0.0, 0.0)
+    y = y[:, None]
+    y_valid = y_valid[:, None]
+
+    values = returns.to_numpy(dtype=np.float64, copy=False)
+    for lo in range(0, values.shape[1], chunksize):
+        x = values[:, lo:lo + chunksize]
+        mask = ~np.isnan(x) & y_valid
+        with warnings.catch_warnings():
+            # All-NaN columns; their shift is irrelevant.
+            warnings.simplefilter('ignore', RuntimeWarning)
+            shift = np.nanmean(np.where(mask, x, np.nan), axis=0)
+        x = np.where(mask, x - np.nan_to_num(shift), 0.0)
+        yy = np.where(mask, y, 0.0)
+        n = _bucket_sums(mask.astype(np.float64), starts)
+        sx = _bucket_sums(x, starts)
+        sy = _bucket_sums(yy, starts)
+        sxx = _bucket_sums(x * x, starts)
+        syy = _bucket_sums(yy * yy, starts)
+        sxy = _bucket_sums(x * yy, starts)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            cov = n * sxy - sx * sy
+            var = (n * sxx - sx * sx) * (n * syy - sy * sy)
+            corr = cov / np.sqrt(var)
+        corr[(n < max(min_periods, 2)) | ~(var > 0)] = np.nan
+        out[:, lo:lo + chunksize] = np.clip(corr, -1.0, 1.0)
+    return pd.DataFrame(out, index=labels, columns=returns.columns, copy=False)
+
+
+RISK_METRICS = ('start', 'end', 'observations', 'total_return',
+                'annual_return', 'annual_volatility', 'sharpe',
+                'downside_deviation', 'sortino', 'max_drawdown')
+
+
+def _per_period(rate, periods_per_year):
+    return (1.0 + rate) ** (1.0 / periods_per_year) - 1.0
+
+
+def risk_report(returns, periods_per_year=252, risk_free=0.0, mar=0.0,
+                min_periods=2, chunksize=512):
+    """Performance and risk statistics for every column of a returns matrix.
+
+    Each column is measured from its first to its last valid return; NaN
+    returns in between are skipped by the moments and leave wealth
+    unchanged.
+
+    Parameters
+    ----------
+    returns : DataFrame
+        Date-indexed simple returns, one column per ticker.
+    periods_per_year : int, default 252
+        Used to annualise; 12 for monthly returns.
+    risk_free : float, default 0.0
+        Annual risk-free rate for the Sharpe ratio.
+    mar : float, default 0.0
+        Annual minimum acceptable return for the downside deviation and
+        the Sortino ratio.
+    min_periods : int, default 2
+        Columns with fewer valid returns get NaN statistics.
+    chunksize : int, default 512
+        Columns processed at a time, bounding temporary memory.
+
+    Returns
+    -------
+    DataFrame
+        One row per column of ``returns`` and the columns of
+        :data:`RISK_METRICS`. ``max_drawdown`` is the largest peak-to-trough
+        fall of cumulative wealth, as a negative fraction.
+    """
+    if not returns.index.is_monotonic_increasing:
+        returns = returns.sort_index(kind='stable')
+    index = returns.index
+    values = returns.to_numpy(dtype=np.float64, copy=False)
+    n_rows, n_cols = values.shape
+    rf = _per_period(risk_free, periods_per_year)
+    floor = _per_period(mar, periods_per_year)
+    stats = {name: np.full(n_cols, np.nan) for name in RISK_METRICS[2:]}
+    stats['observations'][:] = 0
+    first = np.zeros(n_cols, dtype=np.intp)
+    last = np.zeros(n_cols, dtype=np.intp)
+    if not n_rows:
+        # Nothing observed; start and end come out as NaT below.
+        index = index.append(pd.Index([pd.NaT]))
+        n_cols = 0
+
+    for lo in range(0, n_cols, chunksize):
+        cols = slice(lo, lo + chunksize)
+        x = values[:, cols]
+        valid = ~np.isnan(x)
+        n = valid.sum(axis=0)
+        first[cols] = valid.argmax(axis=0)
+        last[cols] = n_rows - 1 - valid[::-1].argmax(axis=0)
+        r = np.where(valid, x, 0.0)
+        wealth = np.cumprod(1.0 + r, axis=0)
+        peak = np.maximum(np.maximum.accumulate(wealth, axis=0), 1.0)
+        drawdown = (wealth / peak - 1.0).min(axis=0)
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = r.sum(axis=0) / n
+            dev = np.where(valid, x - mean, 0.0)
+            std = np.sqrt((dev * dev).sum(axis=0) / (n - 1))
+            down = np.minimum(r - floor, 0.0) * valid
+            downside = np.sqrt((down * down).sum(axis=0) / n)
+            total = wealth[-1] - 1.0
+            years = n / periods_per_year
+            annual = (1.0 + total) ** (1.0 / years) - 1.0
+            scale = np.sqrt(periods_per_year)
+            chunk = {
+                'observations': n,
+                'total_return': total,
+                'annual_return': annual,
+                'annual_volatility': std * scale,
+                'sharpe': (mean - rf) / std * scale,
+                'downside_deviation': downside * scale,
+                'sortino': (mean - floor) / downside * scale,
+                'max_drawdown': drawdown,
+            }
+        short = n < max(min_periods, 1)
+        for name, value in chunk.items():
+            value = np.asarray(value, dtype=np.float64)
+            if name != 'observations':
+                value = np.where(short | ~np.isfinite(value), np.nan, value)
+            stats[name][cols] = value
+
+    observed = stats['observations'] > 0
+    out = pd.DataFrame({
+        'start': index[first].where(observed),
+        'end': index[last].where(observed),
+    }, index=returns.columns)
+    for name in RISK_METRICS[2:]:
+        out[name] = stats[name]
+    out['observations'] = out['observations'].astype(np.int64)
+    return out
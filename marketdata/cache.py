@@ -0,0 +1,237 @@
+"""Persistent on-disk cache of fetched price series.
+
+Entries are keyed by ``(symbol, field, source)`` and remember the date range
+they cover, independently of the dates that actually have data (weekends and
+holidays have none). The covered range ends at the last date returned, so
+dates the source had not published yet are asked for again next time. A
+request for a range only fetches the missing head or tail segments and
+merges them into the entry::
+
+    cache = PriceCache('~/.cache/marketdata')
+    px = cache.fetch('SPY', '2007-01-01', '2015-01-01', field='Adj Close')
+
+Each entry is a pair of ``.npy`` files (``datetime64[ns]`` dates and float64
+values) plus a small JSON sidecar with the covered range. Hits are loaded
+memory-mapped.
+"""
+import json
+import os
+import shutil
+import threading
+from urllib.parse import quote
+
+import numpy as np
+import pandas as pd
+
+from marketdata.fetch import YahooBackend, call_with_retries
+
+_DAY = pd.Timedelta(days=1)
+
+
+def _slice(dates, values, start, end):
+    lo = np.searchsorted(dates, np.datetime64(start, 'ns'), side='left')
+    hi = np.searchsorted(dates, np.datetime64(end, 'ns'), side='right')
+    return dates[lo:hi], values[lo:hi]
+
+
+class PriceCache(object):
+    """Date-range aware cache of single-field price series.
+
+    Parameters
+    ----------
+    root : str
+        Directory holding the cache; created on first write.
+
+    Attributes
+    ----------
+    hits : int
+        Requests served entirely from disk.
+    misses : int
+        Requests for keys that had no entry at all.
+    topups : int
+        Requests that found an entry but had to fetch a head or tail segment.
+    """
+
+    def __init__(self, root):
+        self.root = os.path.expanduser(root)
+        self.hits = 0
+        self.misses = 0
+        self.topups = 0
+        self._lock = threading.Lock()
+
+    def _base(self, symbol, field, source):
+        return os.path.join(self.root, quote(source, safe=''),
+                            quote(field, safe=''), quote(symbol, safe=''))
+
+    def _count(self, name):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def stats(self):
+        """Return the hit/miss/top-up counters as a dict."""
+        return {'hits': self.hits, 'misses': self.misses,
+                'topups': self.topups}
+
+    def coverage(self, symbol, field='Close', source='yahoo'):
+        """Return the ``(start, end)`` Timestamps cached for a key, or None."""
+        try:
+            with open(self._base(symbol, field, source) + '.json') as fh:
+                meta = json.load(fh)
+        except (IOError, OSError, ValueError):
+            return None
+        return pd.Timestamp(meta['start']), pd.Timestamp(meta['end'])
+
+    def load(self, symbol, field='Close', source='yahoo', mmap=True):
+        """Return the cached ``(dates, values)`` arrays for a key, or None.
+
+        With ``mmap=True`` (the default) both arrays are read-only memory
+        maps.
+        """
+        base = self._base(symbol, field, source)
+        mode = 'r' if mmap else None
+        try:
+            dates = np.load(base + '.dates.npy', mmap_mode=mode)
+            values = np.load(base + '.values.npy', mmap_mode=mode)
+        except (IOError, OSError):
+            return None
+        return dates, values
+
+    def store(self, symbol, dates, values, start, end, field='Close',
+              source='yahoo'):
+        """Write an entry covering ``[start, end]``, replacing any old one.
+
+        ``dates`` must be sorted and unique.
+        """
+        base = self._base(symbol, field, source)
+        directory = os.path.dirname(base)
+        if not os.path.isdir(directory):
+            os.makedirs(directory, exist_ok=True)
+        meta = {'start': pd.Timestamp(start).isoformat(),
+                'end': pd.Timestamp(end).isoformat(),
+                'rows': int(len(dates))}
+        # The sidecar goes last: an entry without one reads as a miss.
+        for suffix, arr in (('.dates.npy', dates), ('.values.npy', values)):
+            tmp = base + suffix + '.tmp'
+            with open(tmp, 'wb') as fh:
+                np.save(fh, np.ascontiguousarray(arr))
+            os.replace(tmp, base + suffix)
+        tmp = base + '.json.tmp'
+        with open(tmp, 'w') as fh:
+            json.dump(meta, fh)
+        os.replace(tmp, base + '.json')
+
+    def invalidate(self, symbol=None, field=None, source=None):
+        """Drop every entry matching the given key parts.
+
+        Parts left as None match anything, so ``invalidate()`` clears the
+        whole cache and ``invalidate('SPY')`` drops SPY for every field and
+        source. Returns the number of entries removed.
+        """
+        if symbol is None and field is None and source is None:
+            if not os.path.isdir(self.root):
+                return 0
+            removed = sum(name.endswith('.json')
+                          for _, _, files in os.walk(self.root)
+                          for name in files)
+            shutil.rmtree(self.root)
+            return removed
+        removed = 0
+        sources = [quote(source, safe='')] if source is not None else None
+        for src in sources or self._listdir(self.root):
+            src_dir = os.path.join(self.root, src)
+            fields = [quote(field, safe='')] if field is not None else None
+            for fld in fields or self._listdir(src_dir):
+                fld_dir = os.path.join(src_dir, fld)
+                for name in self._listdir(fld_dir):
+                    if not name.endswith('.json'):
+                        continue
+                    sym = name[:-len('.json')]
+                    if symbol is not None and sym != quote(symbol, safe=''):
+                        continue
+                    base = os.path.join(fld_dir, sym)
+                    for suffix in ('.json', '.dates.npy', '.values.npy'):
+                        if os.path.exists(base + suffix):
+                            os.remove(base + suffix)
+                    removed += 1
+        return removed
+
+    @staticmethod
+    def _listdir(path):
+        try:
+            return sorted(os.listdir(path))
+        except OSError:
+            return []
+
+    def fetch(self, symbol, start, end, field='Close', backend=None,
+              retries=2, backoff=0.5):
+        """Return ``(dates, values)`` for ``[start, end]``, fetching only gaps.
+
+        The backend's ``name`` is used as the key's source. Missing head
+        and tail segments are fetched through ``backend.fetch`` and merged
+        into the stored entry.
+        """
+        if backend is None:
+            backend = YahooBackend()
+
+        def reader(lo, hi):
+            df = call_with_retries(lambda: backend.fetch(symbol, lo, hi),
+                                   retries=retries, backoff=backoff)
+            return (np.asarray(pd.DatetimeIndex(df.index),
+                               dtype='datetime64[ns]'),
+                    np.asarray(df[field], dtype=np.float64))
+
+        return self.fetch_with(reader, symbol, start, end, field,
+                               backend.name)
+
+    def fetch_with(self, reader, symbol, start, end, field, source,
+                   sparse=False):
+        """Like :meth:`fetch`, with a custom ``reader(start, end)`` callable.
+
+        ``reader`` returns sorted, unique ``(dates, values)`` arrays for an
+        inclusive range; it is only called for ranges not yet covered.
+        The range recorded as covered ends at the last date read, unless
+        ``sparse`` (events such as dividends, absent on most dates), where
+        it is the requested range.
+        """
+        start, end = pd.Timestamp(start), pd.Timestamp(end)
+
+        def covered(dates, lo, hi):
+            # Last date known to be covered by a read of [lo, hi].
+            if sparse:
+                return hi
+            if not len(dates):
+                return lo - _DAY
+            return min(hi, pd.Timestamp(dates[-1]))
+
+        cov = self.coverage(symbol, field, source)
+        cached = self.load(symbol, field, source) if cov else None
+        if cached is None:
+            self._count('misses')
+            dates, values = reader(start, end)
+            self.store(symbol, dates, values, start,
+                       covered(dates, start, end), field, source)
+            return dates, values
+
+        cov_start, cov_end = cov
+        if start >= cov_start and end <= cov_end:
+            self._count('hits')
+            return _slice(cached[0], cached[1], start, end)
+
+        self._count('topups')
+        parts = [cached]
+        new_end = cov_end
+        if start < cov_start:
+            parts.insert(0, reader(start, cov_start - _DAY))
+        if end > cov_end:
+            parts.append(reader(cov_end + _DAY, end))
+            new_end = max(cov_end, covered(parts[-1][0], cov_end + _DAY, end))
+        dates = np.concatenate([p[0] for p in parts])
+        values = np.concatenate([p[1] for p in parts])
+        # Segments are disjoint, but a source may return boundary rows
+        # outside the requested range; keep the first occurrence.
+        dates, first = np.unique(dates, return_index=True)
+        values = values[first]
+        del parts, cached
+        self.store(symbol, dates, values, min(start, cov_start), new_end,
+                   field, source)
+        return _slice(dates, values, start, end)
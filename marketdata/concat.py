@@ -0,0 +1,189 @@
+"""Column-wise concatenation into one preallocated block.
+
+``pd.concat(frames, axis=1)`` and ``DataFrame({sym: series, ...})`` build
+the union index, reindex every input to it and then copy the reindexed
+pieces again into the final block. :func:`concat_stream` reads only the
+indexes first, allocates the result once and copies each input straight
+into its columns::
+
+    wide = concat_stream(lambda: (load(sym) for sym in tickers),
+                         keys=tickers)
+
+Given a function returning a fresh iterable, inputs are produced twice and
+never held together, so peak memory stays near the size of the result.
+That suits producers that are cheap to repeat, such as reads from a local
+store or a cache. When the row index is known up front, inputs are read
+once, which is the form to use for downloads::
+
+    wide = concat_stream((get_px(sym, start, end) for sym in tickers),
+                         keys=tickers, index=calendar)
+
+Without ``index``, a one-shot iterator (a generator, say) is read into a
+list first, so every input is held until it has been copied.
+"""
+from collections.abc import Mapping
+
+import numpy as np
+import pandas as pd
+
+
+def _items(frames, keys):
+    """Iterate ``(key, frame)`` pairs; ``key`` is None when not given."""
+    if isinstance(frames, Mapping):
+        return iter(frames.items())
+    if keys is not None:
+        return zip(keys, frames)
+    return ((None, frame) for frame in frames)
+
+
+def _combine(index, other, join):
+    if index is None:
+        return other
+    if index is other or index.equals(other):
+        return index
+    if join == 'outer':
+        return index.union(other)
+    return index.intersection(other)
+
+
+def _labels(key, frame):
+    if isinstance(frame, pd.Series):
+        return [frame.name if key is None else key]
+    if key is None:
+        return list(frame.columns)
+    return [(key, c) for c in frame.columns]
+
+
+def _block(n_rows, n_cols, dtype, fill):
+    """Uninitialised rows x columns block in column-major order."""
+    out = np.empty((n_cols, n_rows), dtype=dtype).T
+    if fill:
+        out.fill(np.nan)
+    return out
+
+
+def _positions(index, sub):
+    """Rows of ``index`` that the rows of ``sub`` land on (-1 if none)."""
+    if sub is index or sub.equals(index):
+        return None
+    if index.is_monotonic_increasing and sub.is_monotonic_increasing \
+            and index.is_unique and sub.is_unique:
+        pos = index.searchsorted(sub)
+        hit = pos < len(index)
+        hit[hit] = index[pos[hit]] == sub[hit]
+        return np.where(hit, pos, -1)
+    return index.get_indexer(sub)
+
+
+def _copy_into(out, j, rows, frame, dtype, fill):
+    """Copy ``frame`` into the columns of ``out`` from ``j``; its width."""
+    values = frame.to_numpy(dtype=dtype)
+    if values.ndim == 1:
+        values = values[:, None]
+    pos = _positions(rows, frame.index)
+    width = values.shape[1]
+    if pos is None:
+        out[:, j:j + width] = values
+    else:
+        hit = pos >= 0
+        if not fill and np.count_nonzero(hit) < len(rows):
+            raise ValueError('inputs do not cover the index; use a '
+                             'float dtype to fill gaps with NaN')
+        out[pos[hit], j:j + width] = values[hit]
+    return width
+
+
+def _columns(labels):
+    if labels and all(isinstance(c, tuple) for c in labels):
+        return pd.MultiIndex.from_tuples(labels)
+    return pd.Index(labels)
+
+
+def _concat_once(frames, keys, rows, dtype, fill):
+    """One pass over the inputs onto known rows.
+
+    The block starts with one column per input (or key) when that number
+    is known, and doubles when the inputs turn out wider.
+    """
+    sized = frames if hasattr(frames, '__len__') else keys
+    out = _block(len(rows), len(sized) if hasattr(sized, '__len__') else 16,
+                 dtype, fill)
+    labels = []
+    j = 0
+    for key, frame in _items(frames, keys):
+        width = frame.shape[1] if frame.ndim == 2 else 1
+        if j + width > out.shape[1]:
+            grown = _block(len(rows), max(2 * out.shape[1], j + width),
+                           dtype, fill)
+            grown[:, :j] = out[:, :j]
+            out = grown
+        labels.extend(_labels(key, frame))
+        j += _copy_into(out, j, rows, frame, dtype, fill)
+    if j < out.shape[1]:
+        out = out[:, :j].copy(order='F')
+    return pd.DataFrame(out, index=rows, columns=_columns(labels),
+                        copy=False)
+
+
+def concat_stream(frames, keys=None, join='outer', index=None,
+                  dtype=np.float64):
+    """Concatenate Series and frames side by side into one block.
+
+    Parameters
+    ----------
+    frames : iterable, Mapping or callable
+        Series or DataFrames. A Mapping supplies keys as well. A callable
+        is called for a fresh iterable of the inputs: twice, so it should
+        be cheap, unless ``index`` is given. Without ``index``, a one-shot
+        iterator is read into a list first; each input is released once
+        copied.
+    keys : sequence, optional
+        Names the Series, or adds an outer column level to frames, like
+        ``pd.concat(..., keys=keys)``.
+    join : {'outer', 'inner'}, default 'outer'
+        Union or intersection of the row indexes.
+    index : Index, optional
+        Final row index, when known in advance (a trading calendar, say).
+        Rows outside it are dropped. Inputs are then read in one pass.
+    dtype : numpy dtype, default float64
+        Dtype of the result block; inputs are cast to it.
+
+    Returns
+    -------
+    DataFrame
+    """
+    if join not in ('outer', 'inner'):
+        raise ValueError("join must be 'outer' or 'inner', got {!r}"
+                         .format(join))
+    fill = np.dtype(dtype).kind in 'fc'
+    if index is not None:
+        return _concat_once(frames() if callable(frames) else frames, keys,
+                            index, dtype, fill)
+    produce = frames if callable(frames) else None
+    owned = (produce is None and not isinstance(frames, Mapping)
+             and iter(frames) is frames)
+    if owned:
+        frames = list(frames)
+
+    def items():
+        return _items(produce() if produce else frames, keys)
+
+    # Pass 1: indexes and column labels only.
+    labels = []
+    rows = None
+    for key, frame in items():
+        labels.extend(_labels(key, frame))
+        rows = _combine(rows, frame.index, join)
+    if rows is None:
+        rows = pd.Index([])
+    columns = _columns(labels)
+
+    # Pass 2: copy each input into its columns of the preallocated block.
+    out = _block(len(rows), len(columns), dtype, fill)
+    j = 0
+    for n, (key, frame) in enumerate(items()):
+        j += _copy_into(out, j, rows, frame, dtype, fill)
+        if owned:
+            frames[n] = None
+    return pd.DataFrame(out, index=rows, columns=columns, copy=False)
+
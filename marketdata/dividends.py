@@ -0,0 +1,115 @@
+"""Batched corporate-actions ingestion.
+
+Replaces the notebook loop::
+
+    for x in tickers:
+        try:
+            dividends[x] = get_px_div(x)
+        except:
+            pass
+
+which fetched one symbol at a time, went through the deprecated ``.ix`` and
+silently dropped every ticker that failed. :func:`fetch_dividends` fetches
+actions concurrently, optionally through a :class:`~marketdata.cache.PriceCache`
+(stored under the ``'DIVIDEND'`` field next to the prices), and returns a
+single long event table plus an :class:`~marketdata.fetch.ErrorReport`.
+"""
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from marketdata.fetch import ErrorReport, YahooBackend, call_with_retries
+
+DIVIDEND = 'DIVIDEND'
+
+
+def take_dividends(actions):
+    """Reduce a ``'yahoo-actions'`` frame to ``(dates, amounts)`` arrays.
+
+    Several dividends going ex on the same date are summed, so the dates
+    are sorted and unique.
+    """
+    mask = np.asarray(actions['action'] == DIVIDEND, dtype=bool)
+    dates = np.asarray(pd.DatetimeIndex(actions.index[mask]),
+                       dtype='datetime64[ns]')
+    amounts = np.asarray(actions['value'], dtype=np.float64)[mask]
+    if len(dates) == 0:
+        return dates, amounts
+    dates, codes = np.unique(dates, return_inverse=True)
+    return dates, np.bincount(codes, weights=amounts, minlength=len(dates))
+
+
+def _fetch_one(backend, symbol, start, end, retries, backoff, cache):
+    def reader(lo, hi):
+        actions = call_with_retries(
+            lambda: backend.fetch_actions(symbol, lo, hi),
+            retries=retries, backoff=backoff)
+        return take_dividends(actions)
+
+    if cache is not None:
+        return cache.fetch_with(reader, symbol, start, end, DIVIDEND,
+                                backend.name, sparse=True)
+    return reader(start, end)
+
+
+def fetch_dividends(tickers, start, end, backend=None, max_workers=8,
+                    retries=2, backoff=0.5, cache=None):
+    """Fetch dividend events for every ticker as one long table.
+
+    Parameters
+    ----------
+    tickers : list of str
+    start, end : str or datetime
+    backend : object, optional
+        Anything with ``fetch_actions(symbol, start, end)`` returning a
+        date-indexed frame with ``action`` and ``value`` columns. Defaults
+        to :class:`~marketdata.fetch.YahooBackend`.
+    max_workers, retries, backoff
+        As for :func:`~marketdata.fetch.fetch_prices`.
+    cache : PriceCache, optional
+
+    Returns
+    -------
+    events : DataFrame
+        Columns ``date``, ``ticker`` (categorical, categories in the order
+        of ``tickers``) and ``amount``, sorted by date then ticker.
+    errors : ErrorReport
+        One record per ticker that still failed after its retries. Those
+        tickers are absent from ``events``.
+    """
+    if backend is None:
+        backend = YahooBackend()
+    tickers = list(pd.unique(pd.Index(tickers)))
+    errors = ErrorReport()
+    dates, amounts, codes = [], [], []
+    workers = max(1, min(max_workers, len(tickers) or 1))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(_fetch_one, backend, sym, start, end, retries,
+                               backoff, cache)
+                   for sym in tickers]
+        for code, (sym, fut) in enumerate(zip(tickers, futures)):
+            try:
+                d, a = fut.result()
+            except Exception as exc:
+                errors.add(sym, 'dividends', exc, retries + 1)
+                continue
+            dates.append(d)
+            amounts.append(a)
+            codes.append(np.full(len(d), code, dtype=np.int32))
+
+    if dates:
+        dates = np.concatenate(dates)
+        amounts = np.concatenate(amounts)
+        codes = np.concatenate(codes)
+    else:
+        dates = np.array([], dtype='datetime64[ns]')
+        amounts = np.array([], dtype=np.float64)
+        codes = np.array([], dtype=np.int32)
+    order = np.lexsort((codes, dates))
+    events = pd.DataFrame({
+        'date': dates[order],
+        'ticker': pd.Categorical.from_codes(codes[order], categories=tickers),
+        'amount': amounts[order],
+    })
+    return events, errors
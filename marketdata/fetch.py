@@ -0,0 +1,252 @@
+"""Concurrent price fetching.
+
+The notebooks build the price matrix one ticker at a time::
+
+    get_px = lambda x: web.DataReader(x, 'yahoo', start=start, end=end)['Close']
+    data = pd.DataFrame({sym: get_px(sym) for sym in tickers})
+
+:func:`fetch_prices` runs the same requests on a bounded worker pool, retries
+transient failures with exponential backoff and fills the aligned wide
+matrix directly instead of building one Series per ticker and realigning
+them at the end.
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+
+class FetchError(Exception):
+    """Raised when one or more symbols could not be fetched.
+
+    Attributes
+    ----------
+    failures : dict
+        Maps each failed symbol to the last exception raised for it.
+    """
+
+    def __init__(self, failures):
+        self.failures = dict(failures)
+        names = ', '.join(sorted(self.failures))
+        super(FetchError, self).__init__(
+            'failed to fetch {} symbol(s): {}'.format(len(self.failures), names))
+
+
+class ErrorReport(object):
+    """Structured record of per-symbol failures in a batch fetch.
+
+    Evaluates as False when nothing failed.
+    """
+
+    columns = ['symbol', 'stage', 'error', 'message', 'attempts']
+
+    def __init__(self):
+        self.records = []
+
+    def add(self, symbol, stage, exc, attempts):
+        self.records.append({'symbol': symbol, 'stage': stage,
+                             'error': type(exc).__name__,
+                             'message': str(exc), 'attempts': attempts})
+
+    @property
+    def symbols(self):
+        return [r['symbol'] for r in self.records]
+
+    def __len__(self):
+        return len(self.records)
+
+    def __repr__(self):
+        return '<ErrorReport: {} failure(s)>'.format(len(self.records))
+
+    def to_frame(self):
+        return pd.DataFrame(self.records, columns=self.columns)
+
+
+class YahooBackend(object):
+    """Backend reading from ``pandas_datareader`` (the notebooks' source).
+
+    ``pandas_datareader`` is only imported on the first request.
+    """
+
+    def __init__(self, source='yahoo', actions_source='yahoo-actions'):
+        self.name = source
+        self.source = source
+        self.actions_source = actions_source
+
+    def fetch(self, symbol, start, end):
+        import pandas_datareader.data as web
+        return web.DataReader(symbol, self.source, start=start, end=end)
+
+    def fetch_actions(self, symbol, start, end):
+        import pandas_datareader.data as web
+        return web.DataReader(symbol, self.actions_source, start=start,
+                              end=end)
+
+
+class StubBackend(object):
+    """In-memory backend serving pre-built frames, for tests and benchmarks.
+
+    Parameters
+    ----------
+    frames : dict
+        Maps symbol to a date-indexed DataFrame with the fields to serve.
+    actions : dict, optional
+        Maps symbol to a date-indexed DataFrame with ``action`` and
+        ``value`` columns, like the ``'yahoo-actions'`` source.
+    latency : float, default 0
+        Seconds to sleep per request, to mimic a network round trip.
+    name : str, default 'stub'
+        Source name, used as part of cache keys.
+    """
+
+    def __init__(self, frames, actions=None, latency=0.0, name='stub'):
+        self.frames = frames
+        self.actions = actions if actions is not None else {}
+        self.latency = latency
+        self.name = name
+        self.calls = 0
+
+    def fetch(self, symbol, start, end):
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        if symbol not in self.frames:
+            raise KeyError('unknown symbol {!r}'.format(symbol))
+        return self.frames[symbol].loc[start:end]
+
+    def fetch_actions(self, symbol, start, end):
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        if symbol not in self.frames:
+            raise KeyError('unknown symbol {!r}'.format(symbol))
+        if symbol not in self.actions:
+            return pd.DataFrame({'action': [], 'value': []},
+                                index=pd.DatetimeIndex([]))
+        return self.actions[symbol].loc[start:end]
+
+
+def call_with_retries(func, retries=2, backoff=0.5):
+    """Call ``func()``, retrying up to ``retries`` times on any exception.
+
+    The wait before retry ``k`` (starting at 0) is ``backoff * 2 ** k``
+    seconds. The last exception is re-raised once retries are exhausted.
+    """
+    attempt = 0
+    while True:
+        try:
+            return func()
+        except Exception:
+            if attempt >= retries:
+                raise
+            time.sleep(backoff * 2 ** attempt)
+            attempt += 1
+
+
+def _as_datetime64(index):
+    return np.asarray(pd.DatetimeIndex(index), dtype='datetime64[ns]')
+
+
+def _fetch_column(backend, symbol, start, end, field, retries, backoff,
+                  cache=None):
+    if cache is not None:
+        return cache.fetch(symbol, start, end, field=field, backend=backend,
+                           retries=retries, backoff=backoff)
+    df = call_with_retries(lambda: backend.fetch(symbol, start, end),
+                           retries=retries, backoff=backoff)
+    return (_as_datetime64(df.index),
+            np.asarray(df[field], dtype=np.float64))
+
+
+def assemble_wide(columns, results):
+    """Fill a dates x columns float64 matrix from ``(dates, values)`` pairs.
+
+    ``results`` maps each column label to a pair of ``datetime64[ns]`` and
+    float64 arrays. The row index is the sorted union of all dates; cells a
+    column has no value for are NaN. The output is allocated once,
+    column-major, so each column is written contiguously.
+    """
+    pairs = [results[c] for c in columns]
+    if not pairs:
+        return pd.DataFrame(columns=columns, dtype=np.float64)
+    first = pairs[0][0]
+    if all(len(d) == len(first) and np.array_equal(d, first)
+           for d, _ in pairs[1:]):
+        dates = first
+        same = True
+    else:
+        dates = np.unique(np.concatenate([d for d, _ in pairs]))
+        same = False
+    out = np.full((len(columns), len(dates)), np.nan).T
+    for j, (d, v) in enumerate(pairs):
+        if same:
+            out[:, j] = v
+        else:
+            out[np.searchsorted(dates, d), j] = v
+    index = pd.DatetimeIndex(dates, name='Date')
+    return pd.DataFrame(out, index=index, columns=columns, copy=False)
+
+
+def get_px(symbol, start, end, field='Adj Close', backend=None, cache=None):
+    """Fetch one field for one symbol as a date-indexed Series.
+
+    The importable form of the notebooks' ``get_px`` lambda.
+    """
+    return fetch_prices([symbol], start, end, field=field, backend=backend,
+                        max_workers=1, cache=cache)[symbol]
+
+
+def fetch_prices(tickers, start, end, field='Close', backend=None,
+                 max_workers=8, retries=2, backoff=0.5, cache=None):
+    """Fetch ``field`` for every ticker concurrently into one wide frame.
+
+    Parameters
+    ----------
+    tickers : list of str
+    start, end : str or datetime
+        Date range, passed through to the backend.
+    field : str, default 'Close'
+        Column of the backend frame to keep, e.g. ``'Adj Close'``.
+    backend : object, optional
+        Anything with ``fetch(symbol, start, end)`` returning a date-indexed
+        DataFrame. Defaults to :class:`YahooBackend`.
+    max_workers : int, default 8
+        Maximum number of requests in flight.
+    retries : int, default 2
+        Retries per symbol after the first failed attempt.
+    backoff : float, default 0.5
+        Base delay in seconds for exponential backoff between retries.
+    cache : PriceCache, optional
+        Serve what is already on disk and only fetch the missing ranges.
+
+    Returns
+    -------
+    DataFrame
+        Dates x tickers, columns in the order of ``tickers``.
+
+    Raises
+    ------
+    FetchError
+        If any symbol still fails after its retries.
+    """
+    if backend is None:
+        backend = YahooBackend()
+    tickers = list(tickers)
+    results = {}
+    failures = {}
+    workers = max(1, min(max_workers, len(tickers) or 1))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            sym: pool.submit(_fetch_column, backend, sym, start, end, field,
+                             retries, backoff, cache)
+            for sym in tickers
+        }
+        for sym, fut in futures.items():
+            try:
+                results[sym] = fut.result()
+            except Exception as exc:
+                failures[sym] = exc
+    if failures:
+        raise FetchError(failures)
+    return assemble_wide(tickers, results)
@@ -0,0 +1,785 @@
+"""Group-wise kernels on factorised group codes.
+
+``groupby(...).apply(func)`` builds a sub-frame and calls Python once per
+group. The functions here factorise the keys once (from the index's level
+codes, or through pandas' ``ngroup``) and reduce the flat value arrays
+with ``np.bincount``-style operations, so their cost does not depend on
+the number of groups.
+
+Every function accepts either a pandas ``GroupBy`` object or a frame plus
+``by``/``level``, the same way ``DataFrame.groupby`` does, or an explicit
+:class:`GroupPlan`. Plans for index levels are cached on the index, so
+repeated calls on the same frame skip the factorisation and sort.
+"""
+import weakref
+
+import numpy as np
+import pandas as pd
+from pandas.core.groupby import GroupBy
+
+from marketdata.periods import FREQS, CalendarKey
+
+WEIGHTED_STATS = ('sum', 'mean', 'var', 'std')
+
+# id(index) -> {plan key: GroupPlan}, see _plan_key. Entries are dropped when
+# the index is garbage collected. The values of a pandas index are immutable
+# and its names are part of the key, so a plan stays valid for as long as
+# its index lives.
+_PLANS = {}
+
+
+class GroupPlan(object):
+    """Factorised grouping of one axis, reusable across group operations.
+
+    Parameters
+    ----------
+    codes : ndarray of intp
+        Group number of each row, -1 for rows whose key is dropped.
+    keys : Index
+        Group labels, one per group number.
+    index : Index, optional
+        The axis the codes describe. When given, sort layouts by its
+        levels are cached on the plan too. No reference to it is kept.
+
+    Attributes
+    ----------
+    codes, keys
+    ngroups : int
+    """
+
+    def __init__(self, codes, keys, index=None):
+        self.codes = codes
+        self.keys = keys
+        self.ngroups = len(keys)
+        self._levels = () if index is None else tuple(index.names)
+        self._layouts = {}
+
+    @classmethod
+    def from_groupby(cls, grouped, index=None):
+        codes = np.asarray(grouped.ngroup().fillna(-1), dtype=np.intp)
+        return cls(codes, grouped.size().index, index=index)
+
+    @classmethod
+    def from_level(cls, index, level, sort=True, dropna=True):
+        """Plan for grouping by one index level, from the level's codes.
+
+        Avoids materialising ``ngroup()``. Returns None for cases left to
+        :meth:`from_groupby`: categorical levels, and missing labels kept
+        with ``dropna=False``.
+        """
+        i = index._get_level_number(level)
+        if isinstance(index, pd.MultiIndex):
+            codes = np.asarray(index.codes[i], dtype=np.intp)
+            labels = index.levels[i]
+        else:
+            codes, labels = pd.factorize(index, sort=sort)
+            codes = np.asarray(codes, dtype=np.intp)
+        if isinstance(labels.dtype, pd.CategoricalDtype) or (
+                not dropna and (codes < 0).any()):
+            return None
+        valid = codes >= 0
+        if sort:
+            # Observed labels, in label order.
+            used = np.bincount(codes[valid], minlength=len(labels)) > 0
+            order = np.flatnonzero(used)
+            if not labels.is_monotonic_increasing:
+                order = order[np.argsort(labels.take(order), kind='stable')]
+        else:
+            # Observed labels, in order of first appearance.
+            seen, first = np.unique(codes[valid], return_index=True)
+            order = seen[np.argsort(first, kind='stable')]
+        if len(order) < len(labels) or (order != np.arange(len(order))).any():
+            remap = np.full(len(labels), -1, dtype=np.intp)
+            remap[order] = np.arange(len(order), dtype=np.intp)
+            codes = np.where(valid, remap[codes], -1)
+            labels = labels.take(order)
+        if isinstance(labels, pd.DatetimeIndex) and labels.freq is not None:
+            labels = pd.DatetimeIndex(labels, freq=None)
+        return cls(codes, labels.rename(index.names[i]), index=index)
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __repr__(self):
+        return '<GroupPlan: {} rows, {} groups>'.format(len(self.codes),
+                                                        self.ngroups)
+
+    def layout(self, frame=None, order=None):
+        """Rows sorted by group, then by ``order`` (or the row order).
+
+        Returns ``(perm, sorted_codes, starts, sizes)``: the row permutation
+        (None when the rows are already sorted), the codes in that order,
+        and the start and length of each run of equal codes.
+        """
+        cacheable = order is None or order in self._levels
+        if cacheable and order in self._layouts:
+            return self._layouts[order]
+        perm = _within_group_order(frame, self.codes, order)
+        sorted_codes = self.codes if perm is None else self.codes[perm]
+        n = len(sorted_codes)
+        change = np.flatnonzero(sorted_codes[1:] != sorted_codes[:-1]) + 1
+        starts = np.concatenate([[0], change]) if n else change
+        sizes = np.diff(np.append(starts, n))
+        result = (perm, sorted_codes, starts, sizes)
+        if cacheable:
+            self._layouts[order] = result
+        return result
+
+
+def _forget(ident):
+    _PLANS.pop(ident, None)
+
+
+def _plan_key(index, level, sort=True, dropna=True):
+    """Cache key of a ``level`` plan on ``index``.
+
+    Levels are resolved to positions, and the current names are part of
+    the key, since ``index.names`` can be reassigned in place.
+    """
+    if isinstance(level, list):
+        position = tuple(index._get_level_number(lv) for lv in level)
+    else:
+        position = index._get_level_number(level)
+    return (position, tuple(index.names), sort, dropna)
+
+
+def group_plan(obj, by=None, level=None, sort=True, dropna=True, plan=None):
+    """Return ``(frame, plan)`` for a GroupBy or a frame plus keys.
+
+    Parameters
+    ----------
+    obj : DataFrame, Series or GroupBy
+        With a GroupBy, ``by``, ``level``, ``sort`` and ``dropna`` are
+        taken from it.
+    by, level, sort, dropna
+        As for ``DataFrame.groupby``. ``by`` may also be a
+        :class:`~marketdata.periods.CalendarKey` (or one of its frequency
+        names, e.g. ``'year'``, when the frame has no such column), whose
+        codes are computed arithmetically from the datetime values.
+    plan : GroupPlan, optional
+        Use this plan for ``obj`` as is.
+
+    Notes
+    -----
+    Plans for ``level`` grouping and for calendar keys on the index are
+    cached per index object and reused until that index is replaced.
+    Column keys can be modified in place, so their plans are rebuilt on
+    every call unless passed as ``plan``.
+    """
+    if isinstance(obj, GroupBy):
+        frame = obj.obj
+        by, level = obj.keys, obj.level
+        sort, dropna = obj.sort, obj.dropna
+        grouped = obj
+    else:
+        frame = obj
+        grouped = None
+    if plan is not None:
+        if len(plan) != len(frame):
+            raise ValueError('plan has {} rows, frame has {}'
+                             .format(len(plan), len(frame)))
+        return frame, plan
+    if by is None and level is None:
+        raise TypeError('pass by or level to group a frame')
+
+    if (isinstance(by, str) and by in FREQS
+            and by not in getattr(frame, 'columns', ())):
+        by = CalendarKey(by)
+    index = frame.index
+    calendar = isinstance(by, CalendarKey)
+    if calendar:
+        cacheable = by.on_index(frame)
+        key = by.cache_key + (tuple(index.names),)
+    else:
+        cacheable = by is None
+        key = _plan_key(index, level, sort, dropna) if cacheable else None
+    if cacheable:
+        plans = _PLANS.get(id(index))
+        if plans is not None and key in plans:
+            return frame, plans[key]
+    if calendar:
+        codes, labels = by.codes(frame)
+        plan = GroupPlan(codes, labels, index=index)
+    else:
+        plan = None
+        if by is None and not isinstance(level, (list, tuple)):
+            plan = GroupPlan.from_level(index, level, sort=sort,
+                                        dropna=dropna)
+        if plan is None:
+            if grouped is None:
+                grouped = frame.groupby(by=by, level=level, sort=sort,
+                                        dropna=dropna)
+            plan = GroupPlan.from_groupby(
+                grouped, index=index if cacheable else None)
+    if cacheable:
+        _cache_plan(index, key, plan)
+    return frame, plan
+
+
+def _cache_plan(index, key, plan):
+    """Store ``plan`` for ``index`` until the index is collected."""
+    if id(index) not in _PLANS:
+        _PLANS[id(index)] = {}
+        weakref.finalize(index, _forget, id(index))
+    _PLANS[id(index)][key] = plan
+
+
+def group_codes(obj, by=None, level=None, sort=True, dropna=True):
+    """Factorise grouping keys.
+
+    Parameters
+    ----------
+    obj : DataFrame, Series or GroupBy
+    by, level, sort, dropna
+        As for :func:`group_plan`.
+
+    Returns
+    -------
+    frame : DataFrame or Series
+        The object being grouped.
+    codes : ndarray of intp
+        Group number of each row, -1 for rows whose key is dropped.
+    keys : Index
+        Group labels, one per group number.
+    """
+    frame, plan = group_plan(obj, by=by, level=level, sort=sort,
+                             dropna=dropna)
+    return frame, plan.codes, plan.keys
+
+
+def _as_list(value):
+    if isinstance(value, (list, tuple)):
+        return list(value), False
+    return [value], True
+
+
+def weighted_agg(obj, values, weights, how='mean', by=None, level=None,
+                 ddof=0, plan=None):
+    """Weighted sum, mean, variance or standard deviation per group.
+
+    Replaces ``grouped.apply(lambda g: np.average(g['data'],
+    weights=g['weights']))``. Rows where the value or the weight is NaN are
+    left out of that value column's statistics.
+
+    Parameters
+    ----------
+    obj : DataFrame or DataFrameGroupBy
+    values : str or list of str
+        Value column(s).
+    weights : str or array-like
+        Weight column, or weights aligned with the rows.
+    how : str or list of str, default 'mean'
+        Any of ``'sum'``, ``'mean'``, ``'var'`` and ``'std'``.
+    by, level, plan
+        Grouping keys when ``obj`` is a frame, see :func:`group_plan`.
+    ddof : int, default 0
+        Variance divisor is ``W - ddof`` with ``W`` the group's weight
+        total, so the default matches ``np.average``-style population
+        variance and ``ddof=1`` treats weights as frequencies.
+
+    Returns
+    -------
+    Series or DataFrame
+        A Series named after ``values`` when both ``values`` and ``how``
+        are single strings, otherwise a frame with ``(value, stat)``
+        columns.
+    """
+    frame, plan = group_plan(obj, by=by, level=level, plan=plan)
+    codes, keys = plan.codes, plan.keys
+    columns, single_value = _as_list(values)
+    stats, single_stat = _as_list(how)
+    unknown = [s for s in stats if s not in WEIGHTED_STATS]
+    if unknown:
+        raise ValueError('unknown statistic(s) {}; expected {}'
+                         .format(unknown, WEIGHTED_STATS))
+    if isinstance(weights, str):
+        w = frame[weights].to_numpy(dtype=np.float64)
+    else:
+        w = np.asarray(weights, dtype=np.float64)
+    ngroups = len(keys)
+    in_group = codes >= 0
+
+    results = {}
+    for col in columns:
+        x = frame[col].to_numpy(dtype=np.float64)
+        ok = in_group & ~np.isnan(x) & ~np.isnan(w)
+        c, xv, wv = codes[ok], x[ok], w[ok]
+        wsum = np.bincount(c, weights=wv, minlength=ngroups)
+        wxsum = np.bincount(c, weights=wv * xv, minlength=ngroups)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = wxsum / wsum
+        out = {'sum': wxsum, 'mean': mean}
+        if 'var' in stats or 'std' in stats:
+            dev = xv - mean[c]
+            m2 = np.bincount(c, weights=wv * dev * dev, minlength=ngroups)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                var = np.where(wsum - ddof > 0, m2 / (wsum - ddof), np.nan)
+            out['var'] = var
+            out['std'] = np.sqrt(var)
+        for stat in stats:
+            results[(col, stat)] = out[stat]
+
+    if single_value and single_stat:
+        return pd.Series(results[(columns[0], stats[0])], index=keys,
+                         name=columns[0])
+    result = pd.DataFrame(results, index=keys)
+    result.columns = pd.MultiIndex.from_tuples(list(results))
+    return result
+
+
+def _values(frame, column):
+    if column is None:
+        if isinstance(frame, pd.DataFrame):
+            raise TypeError('pass column to select the values of a frame')
+        return frame.to_numpy(dtype=np.float64), frame.name
+    return frame[column].to_numpy(dtype=np.float64), column
+
+
+def _order_ranks(frame, order):
+    """Integer ranks of the ``order`` column or index level."""
+    index = frame.index
+    if order in getattr(index, 'names', ()):
+        if isinstance(index, pd.MultiIndex):
+            i = index.names.index(order)
+            if index.levels[i].is_monotonic_increasing:
+                return np.asarray(index.codes[i], dtype=np.int64)
+        key = index.get_level_values(order)
+    else:
+        key = frame[order]
+    return pd.factorize(key, sort=True)[0].astype(np.int64)
+
+
+def _within_group_order(frame, codes, order):
+    """Row permutation sorting by group, then by ``order`` (or row order).
+
+    Returns None when the rows are already in that order.
+    """
+    if order is None:
+        key = codes
+    else:
+        ranks = _order_ranks(frame, order)
+        key = codes.astype(np.int64) * (int(ranks.max(initial=0)) + 1) + ranks
+    if len(key) < 2 or (key[1:] >= key[:-1]).all():
+        return None
+    return np.argsort(key, kind='stable')
+
+
+def _lagged(obj, column, by, level, order, plan):
+    """Sorted flat values with a same-group test for any lag."""
+    frame, plan = group_plan(obj, by=by, level=level, plan=plan)
+    x, name = _values(frame, column)
+    perm, codes, _, _ = plan.layout(frame, order)
+    if perm is not None:
+        x = x[perm]
+    dropped = codes < 0
+    if dropped.any():
+        x = np.where(dropped, np.nan, x)
+
+    def lag(k):
+        prev = np.full(len(x), np.nan)
+        if 0 < k < len(x):
+            same = codes[k:] == codes[:-k]
+            prev[k:] = np.where(same, x[:-k], np.nan)
+        elif -len(x) < k < 0:
+            same = codes[:k] == codes[-k:]
+            prev[:k] = np.where(same, x[-k:], np.nan)
+        return prev
+
+    def restore(sorted_values):
+        if perm is None:
+            return sorted_values
+        out = np.empty(len(sorted_values))
+        out[perm] = sorted_values
+        return out
+
+    return frame, name, x, lag, restore
+
+
+def grouped_shift(obj, column=None, periods=1, by=None, level=None,
+                  order=None, plan=None):
+    """Shift values by ``periods`` rows within each group.
+
+    Parameters
+    ----------
+    obj : DataFrame, Series or GroupBy
+    column : str, optional
+        Value column when grouping a frame.
+    periods : int, default 1
+        Negative values look ahead.
+    by, level, plan
+        Grouping keys when ``obj`` is not a GroupBy, see :func:`group_plan`.
+    order : str, optional
+        Column or index level ordering rows within a group (e.g.
+        ``'Date'``). Defaults to the existing row order, like pandas.
+
+    Returns
+    -------
+    Series
+        Aligned with the original rows.
+    """
+    frame, name, _, lag, restore = _lagged(obj, column, by, level, order, plan)
+    return pd.Series(restore(lag(periods)), index=frame.index, name=name)
+
+
+def grouped_diff(obj, column=None, periods=1, by=None, level=None,
+                 order=None, plan=None):
+    """Difference with the value ``periods`` rows earlier in the group."""
+    frame, name, x, lag, restore = _lagged(obj, column, by, level, order, plan)
+    return pd.Series(restore(x - lag(periods)), index=frame.index, name=name)
+
+
+def grouped_pct_change(obj, column=None, periods=1, by=None, level=None,
+                       order=None, plan=None):
+    """Relative change over ``periods`` rows within each group.
+
+    Missing values are not filled, so a NaN makes both the change into it
+    and the change out of it NaN.
+    """
+    frame, name, x, lag, restore = _lagged(obj, column, by, level, order, plan)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        change = x / lag(periods) - 1.0
+    return pd.Series(restore(change), index=frame.index, name=name)
+
+
+def grouped_returns(obj, column=None, periods=1, log=True, by=None,
+                    level=None, order=None, plan=None):
+    """Simple and log returns over one or more horizons in one pass.
+
+    Replaces ``grouped.apply(lambda g: g['Value'].pct_change())``. The
+    values are sorted by group once and every horizon reuses that order.
+
+    Parameters
+    ----------
+    obj, column, by, level, order, plan
+        As for :func:`grouped_shift`.
+    periods : int or list of int, default 1
+    log : bool, default True
+        Also return log returns.
+
+    Returns
+    -------
+    DataFrame
+        Aligned with the original rows, with columns ``return`` and
+        ``log_return`` for one period and ``return_<k>``/``log_return_<k>``
+        for ``k`` periods.
+    """
+    frame, _, x, lag, restore = _lagged(obj, column, by, level, order, plan)
+    horizons, _ = _as_list(periods)
+    out = {}
+    for k in horizons:
+        suffix = '' if k == 1 else '_{}'.format(k)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            ratio = x / lag(k)
+            out['return' + suffix] = restore(ratio - 1.0)
+            if log:
+                out['log_return' + suffix] = restore(np.log(ratio))
+    return pd.DataFrame(out, index=frame.index)
+
+
+def _positions(frame, plan, order):
+    """In-group position and group size of every row, in one pass."""
+    perm, _, starts, sizes = plan.layout(frame, order)
+    pos = np.arange(len(plan)) - np.repeat(starts, sizes)
+    size = np.repeat(sizes, sizes)
+    if perm is not None:
+        pos[perm] = pos.copy()
+        size[perm] = size.copy()
+    dropped = plan.codes < 0
+    if dropped.any():
+        pos[dropped] = -1
+        size[dropped] = 0
+    return pos, size
+
+
+def positional_mask(obj, head=None, tail=None, nth=None, step=None,
+                    by=None, level=None, order=None, plan=None):
+    """Boolean row mask selecting rows by their position within each group.
+
+    The criteria combine with OR, so ``head=1, tail=1`` keeps the first and
+    last row of every group.
+
+    Parameters
+    ----------
+    obj : DataFrame, Series or GroupBy
+    head, tail : int, optional
+        Keep the first/last ``n`` rows of each group.
+    nth : int or list of int, optional
+        Keep these positions; negative positions count from the end.
+    step : int or (int, int), optional
+        Keep every ``k``-th row, or every ``k``-th row starting at
+        ``offset`` when given ``(k, offset)``.
+    by, level, order, plan
+        As for :func:`grouped_shift`.
+
+    Returns
+    -------
+    ndarray of bool
+    """
+    frame, plan = group_plan(obj, by=by, level=level, plan=plan)
+    pos, size = _positions(frame, plan, order)
+    valid = pos >= 0
+    mask = np.zeros(len(pos), dtype=bool)
+    if head is not None:
+        mask |= valid & (pos < head)
+    if tail is not None:
+        mask |= valid & (pos >= size - tail)
+    if nth is not None:
+        for k in _as_list(nth)[0]:
+            mask |= valid & (pos == (k if k >= 0 else size + k))
+    if step is not None:
+        k, offset = step if isinstance(step, tuple) else (step, 0)
+        mask |= valid & (pos >= offset) & ((pos - offset) % k == 0)
+    return mask
+
+
+def _select(obj, by, level, order, plan, **criteria):
+    frame = obj.obj if isinstance(obj, GroupBy) else obj
+    mask = positional_mask(obj, by=by, level=level, order=order, plan=plan,
+                           **criteria)
+    return frame.iloc[np.flatnonzero(mask)]
+
+
+def grouped_head(obj, n=5, by=None, level=None, order=None,
+                 plan=None):
+    """First ``n`` rows of every group, in the original row order.
+
+    Replaces ``grouped.apply(lambda g: g.iloc[:n]).sort_index()`` without
+    slicing groups or concatenating them.
+    """
+    return _select(obj, by, level, order, plan, head=n)
+
+
+def grouped_tail(obj, n=5, by=None, level=None, order=None,
+                 plan=None):
+    """Last ``n`` rows of every group, in the original row order."""
+    return _select(obj, by, level, order, plan, tail=n)
+
+
+def grouped_nth(obj, n, by=None, level=None, order=None,
+                plan=None):
+    """Row(s) at position(s) ``n`` of every group; negative counts back."""
+    return _select(obj, by, level, order, plan, nth=n)
+
+
+def grouped_every(obj, k, offset=0, by=None, level=None, order=None,
+                  plan=None):
+    """Every ``k``-th row of every group, starting at position ``offset``."""
+    return _select(obj, by, level, order, plan, step=(k, offset))
+
+
+FUSED_STATS = ('count', 'sum', 'mean', 'var', 'std', 'min', 'max', 'first',
+               'last')
+
+
+def _segment_stats(x, starts, stats, ddof):
+    """Reduce sorted values over contiguous group segments along axis 0.
+
+    ``x`` is 1-D, or 2-D with one column per series. Computes only what
+    ``stats`` needs from one set of segment sums; the variance is two-pass
+    (sum of squared deviations from the segment mean) to stay accurate for
+    values far from zero.
+    """
+    valid = ~np.isnan(x)
+    out = {}
+    count = np.add.reduceat(valid.astype(np.int64), starts)
+    out['count'] = count
+    need_mean = {'sum', 'mean', 'var', 'std'} & set(stats)
+    if need_mean:
+        total = np.add.reduceat(np.where(valid, x, 0.0), starts)
+        out['sum'] = total
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = total / count
+        out['mean'] = mean
+        if {'var', 'std'} & set(stats):
+            lengths = np.diff(np.append(starts, len(x)))
+            dev = np.where(valid, x - np.repeat(mean, lengths, axis=0), 0.0)
+            m2 = np.add.reduceat(dev * dev, starts)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                var = np.where(count - ddof > 0, m2 / (count - ddof), np.nan)
+            out['var'] = var
+            out['std'] = np.sqrt(var)
+    if 'min' in stats:
+        out['min'] = np.fmin.reduceat(x, starts)
+    if 'max' in stats:
+        out['max'] = np.fmax.reduceat(x, starts)
+    if 'first' in stats or 'last' in stats:
+        idx = np.arange(len(x)).reshape((-1,) + (1,) * (x.ndim - 1))
+        has = count > 0
+        if 'first' in stats:
+            first = np.minimum.reduceat(np.where(valid, idx, len(x)), starts)
+            first = np.minimum(first, len(x) - 1)
+            out['first'] = np.where(
+                has, np.take_along_axis(x, first, axis=0), np.nan)
+        if 'last' in stats:
+            last = np.maximum.reduceat(np.where(valid, idx, -1), starts)
+            last = np.maximum(last, 0)
+            out['last'] = np.where(
+                has, np.take_along_axis(x, last, axis=0), np.nan)
+    return out
+
+
+def calendar_reduce(obj, key, how='mean', fiscal_start=1, ddof=1):
+    """Resample by calendar bucket and reduce, in one pass.
+
+    Replaces ``data.groupby(lambda x: x.year).mean()``. No per-row labels
+    or group codes are built: bucket boundaries come straight from the
+    int64 bucket keys of the (sorted) dates.
+
+    Parameters
+    ----------
+    obj : DataFrame or Series
+        Numeric, dated by its index or by ``key.on``.
+    key : str or CalendarKey
+        A frequency name from :data:`~marketdata.periods.FREQS` or a key.
+    how : str or list of str, default 'mean'
+        Statistics from :data:`FUSED_STATS`.
+    fiscal_start : int, default 1
+        Used when ``key`` is a frequency name.
+    ddof : int, default 1
+
+    Returns
+    -------
+    DataFrame or Series
+        Buckets x columns; ``(column, stat)`` columns when ``how`` is a
+        list. A Series input with a single ``how`` gives a Series.
+    """
+    if not isinstance(key, CalendarKey):
+        key = CalendarKey(key, fiscal_start=fiscal_start)
+    stats, single_stat = _as_list(how)
+    unknown = [s for s in stats if s not in FUSED_STATS]
+    if unknown:
+        raise ValueError('unknown statistic(s) {}; expected {}'
+                         .format(unknown, FUSED_STATS))
+    is_series = isinstance(obj, pd.Series)
+    frame = obj.to_frame() if is_series else obj
+    if key.on is not None and key.on in frame.columns:
+        frame = frame.drop(columns=key.on)
+    values = key.values(obj)
+    x = frame.to_numpy(dtype=np.float64)
+    dated = ~np.isnat(values)
+    if not dated.all():
+        # Like pandas, leave out rows without a date.
+        values, x = values[dated], x[dated]
+    raw = key.raw(values)
+    if len(raw) > 1 and not (raw[1:] >= raw[:-1]).all():
+        perm = np.argsort(raw, kind='stable')
+        raw, x = raw[perm], x[perm]
+    starts = np.flatnonzero(np.r_[True, raw[1:] != raw[:-1]])[:len(raw)]
+    labels = key.labels(raw[starts])
+    if len(raw):
+        segments = _segment_stats(x, starts, stats, ddof)
+    else:
+        segments = {s: np.empty((0, x.shape[1])) for s in stats}
+    if single_stat:
+        result = pd.DataFrame(segments[stats[0]], index=labels,
+                              columns=frame.columns)
+        return result.iloc[:, 0].rename(obj.name) if is_series else result
+    pieces = {(col, stat): segments[stat][:, j]
+              for j, col in enumerate(frame.columns) for stat in stats}
+    result = pd.DataFrame(pieces, index=labels)
+    result.columns = pd.MultiIndex.from_tuples(list(pieces))
+    return result
+
+
+def fused_agg(obj, spec, by=None, level=None, ddof=1, plan=None):
+    """Several group reductions per column from one grouped sweep.
+
+    Replaces ``grouped.agg({'Returns': ['min', 'max', 'std', 'mean'],
+    'Value': 'mean'})``. The rows are sorted by group once; every
+    statistic in :data:`FUSED_STATS` is then computed over the same
+    contiguous segments. Other entries (``'median'``, callables, ...) are
+    passed to pandas' ``agg`` for that column.
+
+    Parameters
+    ----------
+    obj : DataFrame, Series or GroupBy
+    spec : str, list or dict
+        As for ``GroupBy.agg``; a str or list applies to every non-key
+        column. A Series takes a str or list only.
+    by, level, plan
+        Grouping keys when ``obj`` is a frame, see :func:`group_plan`.
+    ddof : int, default 1
+        Delta degrees of freedom for ``'var'`` and ``'std'``.
+
+    Returns
+    -------
+    DataFrame or Series
+        Same layout as ``agg``: ``(column, stat)`` columns when any entry
+        is a list, otherwise one column per entry. For a Series, one column
+        per stat, or a Series for a single str. NaNs are skipped like in
+        pandas. Fused statistics are float64, except ``count``.
+    """
+    frame, plan = group_plan(obj, by=by, level=level, plan=plan)
+    keys = plan.keys
+    series = isinstance(frame, pd.Series)
+    if series:
+        if isinstance(spec, dict):
+            raise TypeError('a dict spec needs DataFrame input')
+        series_name = frame.name
+        frame = frame.to_frame(name=0)
+        items = [(0, spec)]
+    elif isinstance(spec, dict):
+        items = list(spec.items())
+    else:
+        exclude = set()
+        if isinstance(obj, GroupBy):
+            exclude = set(getattr(obj, 'exclusions', ()))
+        elif isinstance(by, CalendarKey):
+            exclude = {by.on}
+        elif by is not None:
+            exclude = set(_as_list(by)[0])
+        items = [(c, spec) for c in frame.columns if c not in exclude]
+    nested = any(isinstance(how, (list, tuple)) for _, how in items)
+
+    perm, sorted_codes, starts, _ = plan.layout(frame)
+    segment_codes = sorted_codes[starts]
+    keep = segment_codes >= 0
+
+    grouped = obj if isinstance(obj, GroupBy) and not series else None
+    by_codes = None
+    results = []
+    for col, how in items:
+        stats = _as_list(how)[0]
+        fused = [s for s in stats if isinstance(s, str) and s in FUSED_STATS]
+        computed = {}
+        if fused and len(starts):
+            x = frame[col].to_numpy(dtype=np.float64)
+            if perm is not None:
+                x = x[perm]
+            segments = _segment_stats(x, starts, fused, ddof)
+            for stat in fused:
+                values = segments[stat][keep]
+                out = np.full(len(keys), 0 if stat == 'count' else np.nan,
+                              dtype=values.dtype)
+                out[segment_codes[keep]] = values
+                computed[stat] = out
+        elif fused:
+            computed = {s: np.zeros(len(keys), dtype=np.int64)
+                        if s == 'count' else np.full(len(keys), np.nan)
+                        for s in fused}
+        for stat in stats:
+            if stat in computed:
+                values = computed[stat]
+            elif grouped is not None:
+                values = grouped[col].agg(stat).reindex(keys).to_numpy()
+            else:
+                # Group by the plan's codes, which also covers calendar
+                # keys that pandas cannot group by. Dropped rows (code -1)
+                # fall out in the reindex.
+                if by_codes is None:
+                    by_codes = frame.groupby(plan.codes)
+                values = by_codes[col].agg(stat)
+                values = values.reindex(range(plan.ngroups)).to_numpy()
+            name = stat if isinstance(stat, str) else stat.__name__
+            results.append(((col, name) if nested else col, values))
+
+    result = pd.DataFrame({i: v for i, (_, v) in enumerate(results)},
+                          index=keys)
+    labels = [label for label, _ in results]
+    result.columns = (pd.MultiIndex.from_tuples(labels) if nested
+                      else pd.Index(labels))
+    if series:
+        if nested:
+            return result.droplevel(0, axis=1)
+        return result.iloc[:, 0].rename(series_name)
+    return result
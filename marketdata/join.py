@@ -0,0 +1,421 @@
+"""Index joins with a merge-scan fast path for sorted, unique indexes.
+
+Date-indexed frames almost always come sorted with unique dates.
+:func:`join_indexers` checks for that once and reports which path a join
+takes: a linear merge scan for monotonic unique indexes, hashing
+otherwise. The indexers are then applied with one ``take`` per dtype block
+rather than a hash-based ``reindex`` of each side::
+
+    frame, path = ordered_join(returns2, hardcoded, how='left', report=True)
+    first, div2 = ordered_align(first, div2, join='outer')
+
+``how='asof'`` matches each left date with the last right date at or
+before it, for data published on non-trading days.
+
+Joined indexes and indexers are cached per pair of index objects, so
+arithmetic repeated between the same axes skips the join after the first
+time. :func:`align_plan` hands out that cached :class:`AlignPlan` for hot
+loops::
+
+    total = aligned_op(first, div2, 'add', fill_value=0)
+    plan = align_plan(first, div2)
+    for ...:
+        total = plan.apply('add', first, div2, fill_value=0)
+"""
+import operator
+import weakref
+
+import numpy as np
+import pandas as pd
+
+JOIN_HOWS = ('inner', 'outer', 'left', 'right', 'asof')
+
+ARITH_OPS = {
+    'add': operator.add,
+    'sub': operator.sub,
+    'mul': operator.mul,
+    'div': operator.truediv,
+    'truediv': operator.truediv,
+    'floordiv': operator.floordiv,
+    'mod': operator.mod,
+    'pow': operator.pow,
+}
+
+# id(left index) -> {(id(right index), join): (weakref to right, AlignPlan)}.
+# Entries are dropped when either index is collected; the weakref guards
+# against a new right index reusing a collected one's id.
+_ALIGN = {}
+
+
+def _asof_keys(index):
+    """Sortable numpy keys of a sorted index, or None if not numeric."""
+    if isinstance(index, pd.DatetimeIndex):
+        if index.hasnans:
+            return None
+        return index.asi8
+    values = index.to_numpy()
+    if values.dtype.kind not in 'iuf' or (values.dtype.kind == 'f'
+                                         and np.isnan(values).any()):
+        return None
+    return values
+
+
+_UNITS = ('s', 'ms', 'us', 'ns')
+
+
+def _compatible(left, right):
+    if isinstance(left, pd.DatetimeIndex) or isinstance(right,
+                                                        pd.DatetimeIndex):
+        # Pandas joins dates of different units on the finer one.
+        return (isinstance(left, pd.DatetimeIndex)
+                and isinstance(right, pd.DatetimeIndex)
+                and left.tz == right.tz)
+    return True
+
+
+def _common_unit(left, right):
+    """Both date indexes at the finer of their units, as pandas joins them."""
+    if not (isinstance(left, pd.DatetimeIndex)
+            and isinstance(right, pd.DatetimeIndex)
+            and left.unit != right.unit):
+        return left, right
+    unit = max(left.unit, right.unit, key=_UNITS.index)
+    return left.as_unit(unit), right.as_unit(unit)
+
+
+def _scan_asof(a, b, tolerance):
+    """For each key of ``a``, the position of the last ``b`` key <= it."""
+    ridx = np.searchsorted(b, a, side='right') - 1
+    if tolerance is not None and len(b):
+        gap = a - b[np.maximum(ridx, 0)]
+        ridx[gap > tolerance] = -1
+    return ridx
+
+
+def _hash_asof(left, right, tolerance):
+    """``_scan_asof`` for unsorted or duplicated keys, via ``merge_asof``.
+
+    Both sides are sorted first (stably, so the last of equal right keys
+    still wins) and missing keys are left unmatched.
+    """
+    lpos = np.flatnonzero(~left.isna())
+    lpos = lpos[left.take(lpos).argsort(kind='stable')]
+    rpos = np.flatnonzero(~right.isna())
+    rpos = rpos[right.take(rpos).argsort(kind='stable')]
+    if tolerance is not None and isinstance(left, pd.DatetimeIndex):
+        tolerance = pd.Timedelta(tolerance)  # merge_asof takes no strings
+    probe = pd.merge_asof(
+        pd.DataFrame({'key': left.take(lpos)}),
+        pd.DataFrame({'key': right.take(rpos), 'pos': rpos}),
+        on='key', tolerance=tolerance)
+    ridx = np.full(len(left), -1, dtype=np.intp)
+    ridx[lpos] = probe['pos'].fillna(-1).to_numpy().astype(np.intp)
+    return ridx
+
+
+def _tolerance(tolerance, index):
+    if tolerance is None:
+        return None
+    if isinstance(index, pd.DatetimeIndex):
+        delta = pd.Timedelta(tolerance).as_unit(index.unit)
+        return delta.to_timedelta64().astype(np.int64)
+    return tolerance
+
+
+def join_indexers(left, right, how='outer', tolerance=None):
+    """Join two indexes.
+
+    Parameters
+    ----------
+    left, right : Index
+    how : str, default 'outer'
+        ``'inner'``, ``'outer'``, ``'left'``, ``'right'`` or ``'asof'``
+        (left keys, each matched to the last right key at or before it).
+    tolerance : scalar or Timedelta-like, optional
+        For ``'asof'``: leave a key unmatched when the right key is further
+        back than this.
+
+    Returns
+    -------
+    index : Index
+        The joined index.
+    lidx, ridx : ndarray of intp
+        Position in ``left``/``right`` of each entry of ``index``, -1 where
+        that side has no row.
+    path : str
+        ``'merge'`` for the linear scan, ``'hash'`` for the pandas fallback.
+        Except for ``'asof'``, this is predicted from the indexes (sorted,
+        unique, comparable dtypes) rather than reported by pandas, which
+        makes the final choice inside ``Index.join``.
+    """
+    if how not in JOIN_HOWS:
+        raise ValueError('how must be one of {}, got {!r}'
+                         .format(JOIN_HOWS, how))
+    ordered = _compatible(left, right) and all(
+        ix.is_monotonic_increasing and ix.is_unique for ix in (left, right))
+    path = 'merge' if ordered else 'hash'
+
+    if how == 'asof':
+        lidx = np.arange(len(left), dtype=np.intp)
+        lkeys, rkeys = left, right
+        if _compatible(left, right):
+            lkeys, rkeys = _common_unit(left, right)
+        a = _asof_keys(lkeys) if ordered else None
+        b = _asof_keys(rkeys) if a is not None else None
+        if b is not None:
+            ridx = _scan_asof(a, b, _tolerance(tolerance, lkeys))
+            return left, lidx, ridx, 'merge'
+        return left, lidx, _hash_asof(lkeys, rkeys, tolerance), 'hash'
+
+    # For sorted unique indexes pandas' own join is a linear merge scan
+    # (libjoin); only the others are hashed.
+    index, lidx, ridx = left.join(right, how=how, return_indexers=True)
+    n = len(index)
+    lidx = np.arange(n, dtype=np.intp) if lidx is None else lidx
+    ridx = np.arange(n, dtype=np.intp) if ridx is None else ridx
+    return index, lidx, ridx, path
+
+
+def _take(obj, indexer, index):
+    """Rows of ``obj`` at ``indexer`` (-1 gives missing) on ``index``."""
+    if isinstance(obj, pd.Series):
+        values = pd.api.extensions.take(obj.array, indexer, allow_fill=True)
+        return pd.Series(values, index=index, name=obj.name, copy=False)
+    dtypes = set(obj.dtypes)
+    if len(dtypes) == 1 and isinstance(next(iter(dtypes)), np.dtype):
+        # One numpy block: a single take instead of one per column, done
+        # on the transpose so the result is already in pandas' block layout.
+        values = pd.api.extensions.take(obj.to_numpy().T, indexer,
+                                        allow_fill=True, axis=1)
+        return pd.DataFrame(values.T, index=index, columns=obj.columns,
+                            copy=False)
+    columns = {}
+    for i in range(obj.shape[1]):
+        columns[i] = pd.api.extensions.take(obj.iloc[:, i].array, indexer,
+                                            allow_fill=True)
+    out = pd.DataFrame(columns, index=index, copy=False)
+    out.columns = obj.columns
+    return out
+
+
+class AlignPlan(object):
+    """Joined index of two axes plus the indexers into each.
+
+    Built by :func:`align_plan`. ``lidx``/``ridx`` are None when that side
+    already equals the joined index.
+
+    Attributes
+    ----------
+    index : Index
+    lidx, ridx : ndarray of intp or None
+    path : str
+        ``'identity'``, ``'merge'`` or ``'hash'``.
+    """
+
+    def __init__(self, index, lidx, ridx, path, sizes):
+        self.index = index
+        self.lidx = lidx
+        self.ridx = ridx
+        self.path = path
+        self._sizes = sizes
+
+    def __repr__(self):
+        return '<AlignPlan: {} + {} -> {} rows, {}>'.format(
+            self._sizes[0], self._sizes[1], len(self.index), self.path)
+
+    def _check(self, left, right):
+        sizes = (len(left), len(right))
+        if sizes != self._sizes:
+            raise ValueError('plan is for lengths {}, got {}'
+                             .format(self._sizes, sizes))
+
+    @staticmethod
+    def _take(values, indexer, axis):
+        if indexer is None:
+            return values
+        return pd.api.extensions.take(values, indexer, allow_fill=True,
+                                      axis=axis)
+
+    def align(self, left, right):
+        """Reindex Series or frames with matching row axes onto the plan."""
+        self._check(left, right)
+        out = []
+        for obj, indexer in ((left, self.lidx), (right, self.ridx)):
+            if indexer is None:
+                out.append(obj.set_axis(self.index, axis=0))
+            else:
+                out.append(_take(obj, indexer, self.index))
+        return tuple(out)
+
+    def apply(self, op, left, right, fill_value=None, columns=None):
+        """Binary arithmetic between two Series, or two frames.
+
+        Parameters
+        ----------
+        op : str or callable
+            A name from :data:`ARITH_OPS` or a binary function of arrays.
+        left, right : Series or DataFrame
+            Row axes matching the ones the plan was built for.
+        fill_value : scalar, optional
+            As in ``Series.add``: a value missing on one side only is
+            replaced by this before the operation.
+        columns : AlignPlan, optional
+            Column plan, for frames whose columns differ.
+        """
+        self._check(left, right)
+        func = ARITH_OPS[op] if isinstance(op, str) else op
+        frames = isinstance(left, pd.DataFrame)
+        if frames != isinstance(right, pd.DataFrame):
+            raise TypeError('align two Series or two DataFrames')
+        lv, rv = left.to_numpy(), right.to_numpy()
+        if frames:
+            # Work on the transposes: pandas stores frames column-major.
+            lv = self._take(lv.T, self.lidx, 1)
+            rv = self._take(rv.T, self.ridx, 1)
+            if columns is not None:
+                columns._check(left.columns, right.columns)
+                lv = self._take(lv, columns.lidx, 0)
+                rv = self._take(rv, columns.ridx, 0)
+                labels = columns.index
+            elif left.columns.equals(right.columns):
+                labels = left.columns
+            else:
+                raise ValueError('columns differ; pass a column plan')
+        else:
+            lv = self._take(lv, self.lidx, 0)
+            rv = self._take(rv, self.ridx, 0)
+        if fill_value is not None:
+            lmiss, rmiss = pd.isna(lv), pd.isna(rv)
+            lv = np.where(lmiss & ~rmiss, fill_value, lv)
+            rv = np.where(rmiss & ~lmiss, fill_value, rv)
+        with np.errstate(all='ignore'):
+            values = func(lv, rv)
+        if frames:
+            return pd.DataFrame(values.T, index=self.index, columns=labels,
+                                copy=False)
+        name = left.name if left.name == right.name else None
+        return pd.Series(values, index=self.index, name=name, copy=False)
+
+
+def _forget(ident):
+    _ALIGN.pop(ident, None)
+
+
+def _forget_right(left_id, key):
+    plans = _ALIGN.get(left_id)
+    if plans is not None:
+        plans.pop(key, None)
+
+
+def _as_index(obj):
+    return obj if isinstance(obj, pd.Index) else obj.index
+
+
+def align_plan(left, right, join='outer'):
+    """Return the cached :class:`AlignPlan` for two axes.
+
+    Parameters
+    ----------
+    left, right : Index, Series or DataFrame
+        Objects whose row indexes are aligned.
+    join : {'outer', 'inner', 'left', 'right'}, default 'outer'
+        ``'outer'`` is what pandas arithmetic uses.
+
+    Notes
+    -----
+    Plans are cached per pair of index objects, for as long as both live.
+    Pandas indexes are immutable, so a plan stays valid; an equal but
+    distinct index object gets its own plan.
+    """
+    if join == 'asof':
+        raise ValueError("use ordered_join for how='asof'")
+    left, right = _as_index(left), _as_index(right)
+    plans = _ALIGN.get(id(left))
+    entry = plans.get((id(right), join)) if plans else None
+    if entry is not None and entry[0]() is right:
+        return entry[1]
+    sizes = (len(left), len(right))
+    if left is right or left.equals(right):
+        # View: a plan must not keep the index it is cached under alive.
+        plan = AlignPlan(left.view(), None, None, 'identity', sizes)
+    else:
+        index, lidx, ridx, path = join_indexers(left, right, join)
+        if index is left or index is right:
+            index = index.view()
+        n = np.arange(len(index))
+        plan = AlignPlan(index,
+                         None if len(left) == len(index)
+                         and np.array_equal(lidx, n) else lidx,
+                         None if len(right) == len(index)
+                         and np.array_equal(ridx, n) else ridx,
+                         path, sizes)
+    if plans is None:
+        plans = _ALIGN[id(left)] = {}
+        weakref.finalize(left, _forget, id(left))
+    plans[(id(right), join)] = (weakref.ref(right), plan)
+    weakref.finalize(right, _forget_right, id(left), (id(right), join))
+    return plan
+
+
+def aligned_op(left, right, op, fill_value=None, join='outer'):
+    """``left.<op>(right, fill_value=...)`` with cached alignment plans.
+
+    Like pandas arithmetic, rows (and the columns of two frames) are
+    aligned on the outer join by default. Plans for both axes come from
+    :func:`align_plan`, so repeating an operation between the same axes
+    skips the join.
+    """
+    rows = align_plan(left, right, join)
+    columns = None
+    if isinstance(left, pd.DataFrame) and isinstance(right, pd.DataFrame):
+        columns = align_plan(left.columns, right.columns, join)
+    return rows.apply(op, left, right, fill_value=fill_value,
+                      columns=columns)
+
+
+def ordered_align(left, right, join='outer', report=False):
+    """Like ``left.align(right, join=join, axis=0)``, merging sorted indexes.
+
+    Returns ``(left, right)`` reindexed on the joined index, plus the path
+    taken when ``report`` is true. The plan is cached, see
+    :func:`align_plan`.
+    """
+    plan = align_plan(left, right, join)
+    out = plan.align(left, right)
+    return out + (plan.path,) if report else out
+
+
+def ordered_join(left, right, how='left', tolerance=None, lsuffix='',
+                 rsuffix='', report=False):
+    """Join two frames or series on their indexes.
+
+    Equivalent to ``left.join(right, how=how)`` or ``pd.merge(left, right,
+    left_index=True, right_index=True, how=how)``; see
+    :func:`join_indexers` for ``how='asof'`` and ``tolerance``.
+
+    Parameters
+    ----------
+    left, right : DataFrame or named Series
+    how : str, default 'left'
+    tolerance : optional
+    lsuffix, rsuffix : str
+        Added to overlapping column names, as in ``DataFrame.join``.
+    report : bool, default False
+        Also return the path taken, ``'merge'`` or ``'hash'``.
+    """
+    left, right = (obj.to_frame() if isinstance(obj, pd.Series) else obj
+                   for obj in (left, right))
+    overlap = left.columns.intersection(right.columns)
+    if len(overlap):
+        if not (lsuffix or rsuffix):
+            raise ValueError('columns overlap but no suffix specified: {}'
+                             .format(list(overlap)))
+        left = left.rename(columns=lambda c: '{}{}'.format(c, lsuffix)
+                           if c in overlap else c)
+        right = right.rename(columns=lambda c: '{}{}'.format(c, rsuffix)
+                             if c in overlap else c)
+    index, lidx, ridx, path = join_indexers(left.index, right.index, how,
+                                            tolerance=tolerance)
+    out = pd.concat([_take(left, lidx, index), _take(right, ridx, index)],
+                    axis=1)
+    return (out, path) if report else out
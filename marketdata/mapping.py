@@ -0,0 +1,77 @@
+"""Dictionary lookups applied once per distinct value.
+
+``Tidying.py`` derives a column with::
+
+    data['animal'] = data['food'].map(str.lower).map(meat_to_animal)
+
+which makes two Python-level passes over the rows. Holdings tables repeat
+a few thousand tickers over millions of rows. :func:`map_categorical`
+factorises the column, normalises and looks up only the distinct values,
+and broadcasts the result back through the codes::
+
+    data['animal'] = map_categorical(data['food'], meat_to_animal,
+                                     normalize=str.lower)
+"""
+import numpy as np
+import pandas as pd
+
+
+def _normalized(uniques, normalize):
+    if normalize is None:
+        return uniques
+    if isinstance(normalize, str):
+        return getattr(pd.Index(uniques).str, normalize)()
+    return pd.Index([normalize(u) for u in uniques])
+
+
+def _looked_up(keys, mapper):
+    if mapper is None:
+        return keys
+    if callable(mapper) and not isinstance(mapper, (dict, pd.Series)):
+        return pd.Index([mapper(k) for k in keys])
+    if not isinstance(mapper, pd.Series):
+        mapper = pd.Series(mapper, dtype=None if len(mapper) else object)
+    return pd.Index(mapper.reindex(keys).to_numpy())
+
+
+def map_categorical(values, mapper=None, normalize=None, sort=False):
+    """Normalise and map values, touching each distinct value once.
+
+    Equivalent to ``values.map(normalize).map(mapper)`` (either step may
+    be left out), but returned as a categorical.
+
+    Parameters
+    ----------
+    values : Series or array-like
+        Categorical input reuses its codes instead of being factorised.
+    mapper : dict, Series or callable, optional
+        Keys missing from a dict or Series map to NaN, as with
+        ``Series.map``.
+    normalize : callable or str, optional
+        Applied to each distinct value before the lookup. A string names a
+        vectorised ``.str`` method, e.g. ``'lower'`` or ``'strip'``.
+    sort : bool, default False
+        Sort the result categories; by default they are in order of first
+        appearance.
+
+    Returns
+    -------
+    Series or Categorical
+        A categorical Series on the input's index when ``values`` is a
+        Series, otherwise a Categorical. Missing input stays missing.
+    """
+    if isinstance(getattr(values, 'dtype', None), pd.CategoricalDtype):
+        cat = pd.Categorical(values)
+        codes, uniques = np.asarray(cat.codes), cat.categories
+    else:
+        if not hasattr(values, 'dtype'):
+            values = np.asarray(values, dtype=object)
+        codes, uniques = pd.factorize(values)
+    mapped = _looked_up(_normalized(uniques, normalize), mapper)
+    # Several inputs may map to one output, and outputs may be missing.
+    out_codes, categories = pd.factorize(mapped, sort=sort)
+    codes = np.where(codes >= 0, out_codes.take(np.maximum(codes, 0)), -1)
+    result = pd.Categorical.from_codes(codes, categories)
+    if isinstance(values, pd.Series):
+        return pd.Series(result, index=values.index, name=values.name)
+    return result
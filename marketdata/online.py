@@ -0,0 +1,245 @@
+"""Streaming covariance and correlation matrices.
+
+``returns.corr()`` rescans the whole history to add one day.
+:class:`OnlineCovariance` keeps pairwise co-moments instead and folds new
+rows in with the parallel (Chan et al.) form of Welford's update::
+
+    acc = OnlineCovariance(returns.columns)
+    acc.update(returns)              # history, once
+    acc.save('corr_state.npz')
+    ...
+    acc = OnlineCovariance.load('corr_state.npz')
+    acc.update(todays_returns)
+    acc.corr()
+
+Every pair keeps its own count, means and co-moments over the rows where
+both columns are present, so the results match the pairwise-complete
+``DataFrame.cov`` and ``DataFrame.corr``.
+"""
+import json
+
+import numpy as np
+import pandas as pd
+
+_STATE = ('n', 'w', 'v', 'mean', 'cxy', 'cxx')
+_JSON = (str, int, float, bool, type(None))
+
+
+def _json_labels(index):
+    """Index labels as JSON values, or None if any label is not one."""
+    labels = [c.item() if isinstance(c, np.generic) else c for c in index]
+    if all(isinstance(c, _JSON) for c in labels):
+        return labels
+    return None
+
+
+def _divide(num, den):
+    out = np.zeros_like(num)
+    np.divide(num, den, out=out, where=den > 0)
+    return out
+
+
+class OnlineCovariance(object):
+    """Pairwise-complete covariance/correlation accumulator.
+
+    Parameters
+    ----------
+    columns : sequence
+        Column labels; rows passed to :meth:`update` are aligned to them.
+    decay : float, optional
+        Per-row weight decay in (0, 1]: an observation ``k`` rows old has
+        weight ``decay ** k``, like ``ewm(alpha=1 - decay)``.
+    halflife : float, optional
+        Alternative to ``decay``: rows lose half their weight after
+        ``halflife`` rows.
+    window : int, optional
+        Only the last ``window`` rows count. Evicted rows are subtracted
+        from the moments, so the buffer of recent rows is kept.
+    min_periods : int, default 1
+        Pairs observed fewer times are NaN in the results.
+    """
+
+    def __init__(self, columns, decay=None, halflife=None, window=None,
+                 min_periods=1):
+        if halflife is not None:
+            if decay is not None:
+                raise ValueError('pass only one of decay and halflife')
+            decay = 0.5 ** (1.0 / halflife)
+        if decay is not None and not 0 < decay <= 1:
+            raise ValueError('decay must be in (0, 1]')
+        if decay is not None and window is not None:
+            raise ValueError('decay and window cannot be combined')
+        if window is not None and window < 1:
+            raise ValueError('window must be at least 1')
+        self.columns = pd.Index(columns)
+        self.decay = decay
+        self.window = window
+        self.min_periods = min_periods
+        k = len(self.columns)
+        for name in _STATE:
+            setattr(self, name, np.zeros((k, k)))
+        self._buffer = np.empty((0, k))
+        self.nobs = 0
+
+    def _rows(self, rows):
+        if isinstance(rows, pd.Series):
+            rows = rows.to_frame().T
+        if isinstance(rows, pd.DataFrame):
+            rows = rows.reindex(columns=self.columns)
+        rows = np.asarray(rows, dtype=np.float64)
+        if rows.ndim == 1:
+            rows = rows[None, :]
+        if rows.shape[1] != len(self.columns):
+            raise ValueError('expected {} columns, got {}'
+                             .format(len(self.columns), rows.shape[1]))
+        return rows
+
+    @staticmethod
+    def _moments(x, weights):
+        """Pairwise moments of a block of rows, as a state tuple."""
+        valid = ~np.isnan(x)
+        m = valid.astype(np.float64)
+        # Centre on each column's batch mean so the sums below do not
+        # cancel; co-moments are unaffected and the shift is added back.
+        with np.errstate(invalid='ignore'):
+            counts = m.sum(axis=0)
+            shift = np.where(counts > 0, np.nansum(x, axis=0) / counts, 0.0)
+        x0 = np.where(valid, x - shift, 0.0)
+        wm = m * weights[:, None]
+        xw = x0 * weights[:, None]
+        n = m.T @ m
+        w = wm.T @ m
+        v = (wm * weights[:, None]).T @ m
+        sx = xw.T @ m
+        mean = _divide(sx, w)
+        cxy = xw.T @ x0 - _divide(sx * sx.T, w)
+        cxx = (xw * x0).T @ m - _divide(sx * sx, w)
+        return n, w, v, mean + shift[:, None] * (w > 0), cxy, cxx
+
+    def _merge(self, batch):
+        n, w, v, mean, cxy, cxx = batch
+        total = self.w + w
+        delta = mean - self.mean
+        frac = _divide(w, total)
+        factor = _divide(self.w * w, total)
+        self.mean = self.mean + delta * frac
+        self.cxy = self.cxy + cxy + delta * delta.T * factor
+        self.cxx = self.cxx + cxx + delta * delta * factor
+        self.n += n
+        self.w = total
+        self.v += v
+
+    def _remove(self, batch):
+        n, w, v, mean, cxy, cxx = batch
+        rest = self.w - w
+        empty = (self.n - n) <= 0
+        rest[empty] = 0.0
+        rest_mean = _divide(self.w * self.mean - w * mean, rest)
+        delta = mean - rest_mean
+        factor = _divide(rest * w, self.w)
+        self.cxy = self.cxy - cxy - delta * delta.T * factor
+        self.cxx = self.cxx - cxx - delta * delta * factor
+        self.mean = rest_mean
+        self.n -= n
+        self.w = rest
+        self.v -= v
+        for name in _STATE:
+            getattr(self, name)[empty] = 0.0
+
+    def update(self, rows):
+        """Fold new rows (a DataFrame, Series or 2-D array) into the state."""
+        x = self._rows(rows)
+        if not len(x):
+            return self
+        if self.decay is not None:
+            b = len(x)
+            scale = self.decay ** b
+            self.w *= scale
+            self.cxy *= scale
+            self.cxx *= scale
+            self.v *= scale * scale
+            weights = self.decay ** np.arange(b - 1, -1, -1, dtype=np.float64)
+        else:
+            weights = np.ones(len(x))
+        self._merge(self._moments(x, weights))
+        self.nobs += len(x)
+        if self.window is not None:
+            buf = np.concatenate([self._buffer, x])
+            excess = len(buf) - self.window
+            if excess > 0:
+                self._remove(self._moments(buf[:excess], np.ones(excess)))
+                buf = buf[excess:]
+            self._buffer = buf
+        return self
+
+    def _frame(self, values):
+        values[self.n < max(self.min_periods, 1)] = np.nan
+        return pd.DataFrame(values, index=self.columns, columns=self.columns)
+
+    def cov(self, ddof=1):
+        """Return the current covariance matrix.
+
+        With decay the correction uses the effective sample size
+        ``W ** 2 / sum(w ** 2)``, like ``ewm(...).cov(bias=False)``.
+        """
+        with np.errstate(invalid='ignore', divide='ignore'):
+            den = self.w - ddof * _divide(self.v, self.w)
+            values = np.where(den > 0, self.cxy / den, np.nan)
+        return self._frame(values)
+
+    def corr(self):
+        """Return the current correlation matrix."""
+        with np.errstate(invalid='ignore', divide='ignore'):
+            den = np.sqrt(self.cxx * self.cxx.T)
+            values = np.where(den > 0, self.cxy / den, np.nan)
+        values = np.clip(values, -1.0, 1.0)
+        return self._frame(values)
+
+    def save(self, path, allow_pickle=False):
+        """Write the full state to an ``.npz`` file.
+
+        Column labels are stored as JSON, with the Index dtype, so strings
+        and numbers come back as they were. Other labels (tuples,
+        timestamps, ...) raise ``ValueError`` unless ``allow_pickle=True``,
+        in which case the Index is pickled and :meth:`load` must opt in too.
+        """
+        config = {'decay': self.decay, 'window': self.window,
+                  'min_periods': self.min_periods, 'nobs': self.nobs}
+        labels = _json_labels(self.columns)
+        index_name = _json_labels([self.columns.name])
+        arrays = {name: getattr(self, name) for name in _STATE}
+        if labels is not None and index_name is not None:
+            config['columns'] = labels
+            config['columns_dtype'] = str(self.columns.dtype)
+            config['columns_name'] = index_name[0]
+        elif allow_pickle:
+            arrays['columns'] = np.empty(1, dtype=object)
+            arrays['columns'][0] = self.columns
+        else:
+            raise ValueError('column labels are not JSON values; '
+                             'pass allow_pickle=True to pickle them')
+        np.savez(path, config=np.array(json.dumps(config)),
+                 buffer=self._buffer, **arrays)
+
+    @classmethod
+    def load(cls, path, allow_pickle=False):
+        """Restore an accumulator written by :meth:`save`.
+
+        ``allow_pickle`` is needed only for states saved with pickled labels.
+        """
+        with np.load(path, allow_pickle=allow_pickle) as data:
+            config = json.loads(str(data['config']))
+            if 'columns' in config:
+                columns = pd.Index(config['columns'],
+                                   dtype=config['columns_dtype'],
+                                   name=config['columns_name'])
+            else:
+                columns = data['columns'][0]
+            acc = cls(columns, decay=config['decay'],
+                      window=config['window'],
+                      min_periods=config['min_periods'])
+            for name in _STATE:
+                setattr(acc, name, data[name].copy())
+            acc._buffer = data['buffer'].copy()
+        acc.nobs = config['nobs']
+        return acc
@@ -0,0 +1,222 @@
+"""Process-parallel ``groupby(...).apply`` for functions that cannot be
+vectorised, such as per-ticker model fits.
+
+:func:`parallel_apply` sorts the rows by group once and copies each column
+(and index level) into a shared memory block. Worker processes attach to
+those blocks and rebuild each group as a slice, so group data is never
+pickled. Groups are packed into tasks largest first, to balance the load
+across workers. Results are put back together in group order, whichever
+worker finished first::
+
+    def fit(group):
+        ...
+        return pd.Series({'alpha': a, 'beta': b})
+
+    params = parallel_apply(data3, fit, level='Index', max_workers=64)
+
+``func`` must be picklable, i.e. defined at module level.
+"""
+import heapq
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from marketdata.groupby import group_plan
+
+# Shared memory blocks attached in this (worker) process, by name.
+_ATTACHED = {}
+
+# What every task needs besides its groups: func, column and index
+# encodings. Set once per worker process by the pool initializer.
+_SPEC = {}
+
+
+def _share(values, blocks):
+    """Copy an array into a new shared block; return its description."""
+    values = np.ascontiguousarray(values)
+    shm = shared_memory.SharedMemory(create=True, size=max(values.nbytes, 1))
+    blocks.append(shm)
+    np.ndarray(values.shape, dtype=values.dtype, buffer=shm.buf)[:] = values
+    return shm.name, values.dtype.str, len(values)
+
+
+def _encode(values, perm, blocks):
+    """Describe one column or index level, sorted by ``perm``.
+
+    Plain numpy dtypes are shared as is. Anything else (strings,
+    categoricals, tz-aware dates) is factorised: its codes are shared and
+    its unique values travel with each task.
+    """
+    dtype = values.dtype
+    if isinstance(dtype, np.dtype) and dtype != object:
+        arr = np.asarray(values)
+        return ('raw', _share(arr if perm is None else arr[perm], blocks),
+                None)
+    codes, uniques = pd.factorize(values, use_na_sentinel=True)
+    codes = codes if perm is None else codes[perm]
+    return ('codes', _share(codes, blocks), uniques)
+
+
+def _attach(desc):
+    name, dtype, length = desc
+    shm = _ATTACHED.get(name)
+    if shm is None:
+        shm = _ATTACHED[name] = shared_memory.SharedMemory(name=name)
+    return np.ndarray((length,), dtype=np.dtype(dtype), buffer=shm.buf)
+
+
+def _decode(encoded, start, stop):
+    kind, desc, uniques = encoded
+    values = _attach(desc)[start:stop]
+    if kind == 'raw':
+        # A private copy of just this group, so that results holding on to
+        # it stay valid once the shared blocks are released.
+        return values.copy()
+    return uniques.take(values, allow_fill=True)
+
+
+def _init_worker(spec):
+    _SPEC.clear()
+    _SPEC.update(spec)
+
+
+def _run_task(groups):
+    """Apply the worker's ``func`` to each ``(code, start, stop)`` group."""
+    spec = _SPEC
+    func = spec['func']
+    out = []
+    for code, start, stop in groups:
+        levels = [_decode(enc, start, stop) for enc in spec['index']]
+        if len(levels) == 1:
+            index = pd.Index(levels[0], name=spec['index_names'][0])
+        else:
+            index = pd.MultiIndex.from_arrays(levels,
+                                              names=spec['index_names'])
+        if spec['series']:
+            group = pd.Series(_decode(spec['columns'][0][1], start, stop),
+                              index=index, name=spec['columns'][0][0])
+        else:
+            group = pd.DataFrame(
+                {name: _decode(enc, start, stop)
+                 for name, enc in spec['columns']},
+                index=index, columns=[name for name, _ in spec['columns']])
+        out.append((code, func(group)))
+    return out
+
+
+def _pack(sizes, n_tasks):
+    """Longest-processing-time packing of groups into ``n_tasks`` bins."""
+    bins = [(0, i, []) for i in range(n_tasks)]
+    heapq.heapify(bins)
+    for g in np.argsort(-sizes, kind='stable'):
+        load, i, members = heapq.heappop(bins)
+        members.append(int(g))
+        heapq.heappush(bins, (load + int(sizes[g]), i, members))
+    tasks = [members for _, _, members in sorted(bins, key=lambda b: -b[0])]
+    return [t for t in tasks if t]
+
+
+def _combine(keys, codes, results):
+    if not len(codes):
+        return pd.Series([], index=keys[:0], dtype=object)
+    values = [results[c] for c in codes]
+    labels = keys.take(codes)
+    if all(isinstance(v, pd.DataFrame) for v in values):
+        return pd.concat(values, keys=labels, names=keys.names)
+    if all(isinstance(v, pd.Series) for v in values):
+        out = pd.DataFrame(values)
+        out.index = labels
+        return out
+    return pd.Series(values, index=labels)
+
+
+def parallel_apply(obj, func, by=None, level=None, columns=None, plan=None,
+                   max_workers=None, tasks_per_worker=4):
+    """Apply ``func`` to every group on a pool of processes.
+
+    Parameters
+    ----------
+    obj : DataFrame, Series or GroupBy
+    func : callable
+        Picklable function of one group (a DataFrame, or a Series when
+        grouping a Series). It gets the group's rows in their original
+        relative order, with their index.
+    by, level, plan
+        As for :func:`~marketdata.groupby.group_plan`.
+    columns : label or list, optional
+        Only pass these columns of a DataFrame to ``func``; a single label
+        passes a Series.
+    max_workers : int, optional
+        Defaults to the number of CPUs. With 1, everything runs in-process.
+    tasks_per_worker : int, default 4
+        Groups are packed into ``max_workers * tasks_per_worker`` tasks of
+        similar total size.
+
+    Returns
+    -------
+    Series or DataFrame
+        Indexed by group key in group order: a Series of scalar results, a
+        frame with one row per group when ``func`` returns Series, or the
+        concatenated frames keyed by group when it returns DataFrames.
+        Groups for which ``func`` returns None are left out.
+    """
+    frame, plan = group_plan(obj, by=by, level=level, plan=plan)
+    if columns is not None:
+        frame = frame[columns]
+    perm, sorted_codes, starts, sizes = plan.layout()
+    keep = sorted_codes[starts] >= 0 if len(starts) else starts.astype(bool)
+    group_codes = sorted_codes[starts][keep]
+    bounds = {int(c): (int(s), int(s + n))
+              for c, s, n in zip(group_codes, starts[keep], sizes[keep])}
+    if not bounds:
+        return _combine(plan.keys, [], {})
+
+    workers = max_workers or os.cpu_count() or 1
+    blocks = []
+    try:
+        series = isinstance(frame, pd.Series)
+        if series:
+            columns = [(frame.name, _encode(frame, perm, blocks))]
+        else:
+            columns = [(name, _encode(frame[name], perm, blocks))
+                       for name in frame.columns]
+        index = frame.index
+        levels = ([index.get_level_values(i) for i in range(index.nlevels)]
+                  if isinstance(index, pd.MultiIndex) else [index])
+        spec = {'func': func, 'series': series, 'columns': columns,
+                'index': [_encode(lv, perm, blocks) for lv in levels],
+                'index_names': list(index.names)}
+
+        order = np.array(sorted(bounds), dtype=np.intp)
+        group_sizes = np.array([bounds[c][1] - bounds[c][0] for c in order])
+        n_tasks = min(len(order), workers * max(tasks_per_worker, 1))
+        tasks = [[(int(order[g]),) + bounds[int(order[g])] for g in members]
+                 for members in _pack(group_sizes, n_tasks)]
+
+        results = {}
+        if workers == 1:
+            _init_worker(spec)
+            for task in tasks:
+                results.update(_run_task(task))
+        else:
+            # The spec is pickled once per worker; tasks carry only their
+            # group bounds.
+            with ProcessPoolExecutor(max_workers=min(workers, len(tasks)),
+                                     initializer=_init_worker,
+                                     initargs=(spec,)) as pool:
+                for done in pool.map(_run_task, tasks):
+                    results.update(done)
+    finally:
+        _SPEC.clear()
+        for shm in _ATTACHED.values():
+            shm.close()
+        _ATTACHED.clear()
+        for shm in blocks:
+            shm.close()
+            shm.unlink()
+
+    codes = [c for c in order if results[c] is not None]
+    return _combine(plan.keys, np.array(codes, dtype=np.intp), results)
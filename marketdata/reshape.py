@@ -0,0 +1,197 @@
+"""Long-format views over the wide price matrix.
+
+The notebooks reshape with::
+
+    long = pd.melt(data, id_vars='Date', var_name='Index',
+                   value_name='Value').set_index(['Index', 'Date'])
+    wide = long['Value'].unstack('Index')
+
+and every step copies the values and repeats both labels once per cell.
+A :class:`LongView` keeps the wide frame as is. Its long values are the
+column-major ravel of the matrix, a view for single-dtype frames, and its
+``(Index, Date)`` MultiIndex is the product of the two axes, built only
+when asked for::
+
+    view = LongView(data)
+    fused_agg(view.to_series().groupby(level='Index'), ['mean', 'std'])
+    to_wide(view.to_series())        # the original frame, no unstack
+
+Grouping the materialised series or frame by either level reuses plans
+derived from the layout, so nothing is factorised.
+"""
+import weakref
+
+import numpy as np
+import pandas as pd
+
+from marketdata.groupby import GroupPlan, _cache_plan, _plan_key
+
+# id(long index) -> (wide frame, location of the long values), for
+# recognising data built by a view. Entries go when the index is collected.
+_VIEWS = {}
+
+
+def _forget(ident):
+    _VIEWS.pop(ident, None)
+
+
+def _data_pointer(arr):
+    return arr.__array_interface__['data'][0], arr.strides, arr.shape
+
+
+class LongView(object):
+    """Melted, ``(var_name, index name)``-indexed view of a wide frame.
+
+    Parameters
+    ----------
+    wide : DataFrame
+        Dates x tickers. Column and index labels must be unique.
+    var_name : str, default 'Index'
+        Name of the column level, as in ``pd.melt``.
+    value_name : str, default 'Value'
+
+    Attributes
+    ----------
+    wide : DataFrame
+    values : ndarray
+        Long values, column after column.
+    """
+
+    def __init__(self, wide, var_name='Index', value_name='Value'):
+        if not (wide.columns.is_unique and wide.index.is_unique):
+            raise ValueError('LongView needs unique index and column labels')
+        self.wide = wide
+        self.var_name = var_name
+        self.value_name = value_name
+        self.date_name = wide.index.name if wide.index.name is not None \
+            else 'Date'
+        self.values = wide.to_numpy(copy=False).ravel(order='F')
+        self._index = None
+
+    def __len__(self):
+        return self.wide.shape[0] * self.wide.shape[1]
+
+    def __repr__(self):
+        return '<LongView: {} {} x {} {}>'.format(
+            self.wide.shape[1], self.var_name, self.wide.shape[0],
+            self.date_name)
+
+    @property
+    def names(self):
+        return [self.var_name, self.date_name]
+
+    def level_codes(self, level):
+        """``(codes, labels)`` of one level, without factorising."""
+        n_rows, n_cols = self.wide.shape
+        if level in (0, self.var_name):
+            return (np.repeat(np.arange(n_cols, dtype=np.intp), n_rows),
+                    self.wide.columns)
+        if level in (1, self.date_name):
+            return (np.tile(np.arange(n_rows, dtype=np.intp), n_cols),
+                    self.wide.index)
+        raise KeyError('level {!r} not in {}'.format(level, self.names))
+
+    @property
+    def index(self):
+        """The ``(var_name, date)`` MultiIndex, built once on first use."""
+        if self._index is None:
+            var_codes, columns = self.level_codes(0)
+            date_codes, dates = self.level_codes(1)
+            index = pd.MultiIndex(levels=[columns, dates],
+                                  codes=[var_codes, date_codes],
+                                  names=self.names, verify_integrity=False)
+            for level in range(2):
+                for sort in (True, False):
+                    plan = self.plan(level, sort=sort)
+                    if plan is None:
+                        continue
+                    for dropna in (True, False):
+                        _cache_plan(index,
+                                    _plan_key(index, level, sort, dropna),
+                                    plan)
+            _VIEWS[id(index)] = (self.wide, _data_pointer(self.values))
+            weakref.finalize(index, _forget, id(index))
+            self._index = index
+        return self._index
+
+    def plan(self, level, sort=True):
+        """GroupPlan for grouping the long rows by ``level``.
+
+        Returns None when the level has missing labels, which pandas would
+        drop; grouping then falls back to the usual factorisation.
+        """
+        codes, labels = self.level_codes(level)
+        if labels.hasnans:
+            return None
+        in_order = not sort or labels.is_monotonic_increasing
+        if not in_order:
+            order = labels.argsort(kind='stable')
+            rank = np.empty(len(order), dtype=np.intp)
+            rank[order] = np.arange(len(order), dtype=np.intp)
+            codes, labels = rank[codes], labels.take(order)
+        if isinstance(labels, pd.DatetimeIndex):
+            labels = pd.DatetimeIndex(labels, freq=None)  # as groupby keys
+        plan = GroupPlan(codes, labels.rename(self.names[level]))
+        if in_order:
+            # The layout follows from the shape: rows are grouped by
+            # ticker already, and by date after a transpose.
+            n_rows, n_cols = self.wide.shape
+            if level in (0, self.var_name):
+                perm, size = None, n_rows
+            else:
+                perm = np.arange(len(codes), dtype=np.intp)
+                perm = perm.reshape(n_cols, n_rows).T.ravel()
+                size = n_cols
+            starts = np.arange(len(labels), dtype=np.intp) * size
+            sizes = np.full(len(labels), size, dtype=np.intp)
+            sorted_codes = codes if perm is None else codes[perm]
+            plan._layouts[None] = (perm, sorted_codes, starts, sizes)
+        return plan
+
+    def to_series(self):
+        """Long values as a Series on :attr:`index`, sharing memory."""
+        return pd.Series(self.values, index=self.index, name=self.value_name,
+                         copy=False)
+
+    def to_frame(self):
+        """Like ``melt(...).set_index([var_name, date])``, sharing memory."""
+        return pd.DataFrame(self.values[:, None], index=self.index,
+                            columns=[self.value_name], copy=False)
+
+    def to_wide(self):
+        """The wide frame, O(1)."""
+        return self.wide.copy(deep=False)
+
+
+def long_view(wide, var_name='Index', value_name='Value'):
+    """Return a :class:`LongView` of ``wide``."""
+    return LongView(wide, var_name=var_name, value_name=value_name)
+
+
+def to_wide(obj, values=None):
+    """Pivot long data back to dates x tickers.
+
+    A :class:`LongView`, or a Series or one-column frame taken unchanged
+    from one, gives back the view's wide frame without reshaping. Anything
+    else is unstacked on its first index level.
+
+    Parameters
+    ----------
+    obj : LongView, Series or DataFrame
+    values : str, optional
+        Column of a DataFrame to pivot. Defaults to its only column.
+    """
+    if isinstance(obj, LongView):
+        return obj.to_wide()
+    entry = _VIEWS.get(id(obj.index))
+    if isinstance(obj, pd.DataFrame):
+        if values is None:
+            if obj.shape[1] != 1:
+                raise ValueError('pass values to pivot a multi-column frame')
+            values = obj.columns[0]
+        obj = obj[values]
+    if entry is not None:
+        wide, pointer = entry
+        if _data_pointer(obj.to_numpy(copy=False)) == pointer:
+            return wide.copy(deep=False)
+    return obj.unstack(level=0)
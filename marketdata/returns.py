@@ -0,0 +1,111 @@
+"""Total returns from a price matrix and a sparse dividend table.
+
+The notebook computed total returns as::
+
+    first = data - data.shift(1)
+    tot = first.add(div2, fill_value=0)
+    ret = tot.div(data.shift(1), fill_value=1)
+
+which materialises several full-size intermediates, two of them shifted
+copies of the prices, and divides by 1 wherever the previous price is
+missing (the source of values like ``2.0022`` in ``returns_mine``).
+:func:`total_returns` writes into a single preallocated output instead.
+"""
+import numpy as np
+import pandas as pd
+
+
+def _event_positions(index, columns, dividends, with_prev):
+    """Map dividend events to ``(row, col, amount)`` arrays.
+
+    An ex-date that is not a row of ``index`` (a holiday) counts towards
+    the next row. Events after the last row, for unknown tickers, or before
+    the first row (unless ``with_prev``) are dropped.
+    """
+    dates = np.asarray(pd.DatetimeIndex(dividends['date']),
+                       dtype='datetime64[ns]')
+    rows = np.searchsorted(np.asarray(index, dtype='datetime64[ns]'), dates,
+                           side='left')
+    cols = columns.get_indexer(dividends['ticker'])
+    amounts = np.asarray(dividends['amount'], dtype=np.float64)
+    keep = (rows < len(index)) & (cols >= 0)
+    if not with_prev and len(index):
+        keep &= dates >= np.datetime64(index[0], 'ns')
+    return rows[keep], cols[keep], amounts[keep]
+
+
+def total_returns(prices, dividends=None, prev=None, missing='nan'):
+    """Compute simple total returns ``(P[t] - P[t-1] + D[t]) / P[t-1]``.
+
+    Parameters
+    ----------
+    prices : DataFrame
+        Dates x tickers prices, sorted by date.
+    dividends : DataFrame, optional
+        Long event table with ``date``, ``ticker`` and ``amount`` columns, as
+        returned by :func:`~marketdata.dividends.fetch_dividends`.
+    prev : Series, optional
+        Prices on the date before the first row, indexed by ticker. When
+        given the first row gets a return, and dividends dated before the
+        first row are taken to fall between ``prev`` and the first row.
+        Without it the first row is NaN.
+    missing : {'nan', 'skip'}, default 'nan'
+        How to handle missing prices. With ``'nan'`` a missing price makes
+        both its own return and the next one NaN. With ``'skip'`` the next
+        available price is compared with the last available one, so the
+        return over a gap lands on the first date after it. Dividends
+        dated on a missing price count towards that same date. ``'skip'``
+        needs an extra forward-filled copy of the prices.
+
+    Returns
+    -------
+    DataFrame
+        Same shape, index and columns as ``prices``.
+
+    Notes
+    -----
+    With ``missing='nan'`` the only full-size allocation is the output,
+    so peak memory is about twice the price matrix.
+    """
+    if missing not in ('nan', 'skip'):
+        raise ValueError("missing must be 'nan' or 'skip', got {!r}"
+                         .format(missing))
+    index, columns = prices.index, prices.columns
+    P = prices.to_numpy(dtype=np.float64, copy=False)
+    nrows, ncols = P.shape
+    if prev is not None:
+        prev = np.asarray(pd.Series(prev).reindex(columns), dtype=np.float64)
+
+    if missing == 'skip':
+        base = prices.ffill().to_numpy(dtype=np.float64, copy=False)
+        if prev is not None and nrows:
+            base = np.where(np.isnan(base), prev, base)
+    else:
+        base = P
+
+    # Column-major like the frames pandas builds, so the frame wraps it.
+    out = np.empty((ncols, nrows)).T
+    if nrows:
+        np.subtract(P[1:], base[:-1], out=out[1:])
+        if prev is None:
+            out[0] = np.nan
+        else:
+            np.subtract(P[0], prev, out=out[0])
+
+    if dividends is not None and len(dividends) and nrows:
+        rows, cols, amounts = _event_positions(index, columns, dividends,
+                                               prev is not None)
+        if missing == 'skip':
+            # Roll events on a missing price forward to the next price.
+            for k in np.flatnonzero(np.isnan(P[rows, cols])):
+                later = ~np.isnan(P[rows[k]:, cols[k]])
+                rows[k] = rows[k] + later.argmax() if later.any() else nrows
+            keep = rows < nrows
+            rows, cols, amounts = rows[keep], cols[keep], amounts[keep]
+        np.add.at(out, (rows, cols), amounts)
+
+    if nrows:
+        np.divide(out[1:], base[:-1], out=out[1:])
+        if prev is not None:
+            np.divide(out[0], prev, out=out[0])
+    return pd.DataFrame(out, index=index, columns=columns, copy=False)
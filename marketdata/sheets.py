@@ -0,0 +1,118 @@
+"""Parsed-spreadsheet cache.
+
+The notebooks call ``pd.read_excel`` on the same workbooks every run
+(``tickers.xlsx``, ``returns.xlsx``, ``Performance Comps.xlsx``) and
+openpyxl parsing dominates their start-up. :func:`read_excel_cached` parses
+each sheet once, stores it as a pickle keyed on the workbook's path,
+modification time and size, and serves later reads from the pickle::
+
+    tickers = read_excel_cached('tickers.xlsx')['Ticker'].tolist()
+
+Sheets missing from the cache are parsed in parallel, one process per
+sheet.
+"""
+import hashlib
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+DEFAULT_CACHE_DIR = os.path.join('~', '.cache', 'marketdata', 'sheets')
+
+
+def _digest(*parts):
+    return hashlib.sha1(repr(parts).encode('utf-8')).hexdigest()[:16]
+
+
+def _cache_path(cache_dir, path, sheet, kwargs):
+    st = os.stat(path)
+    prefix = _digest(path, sheet, sorted(kwargs.items()))
+    version = _digest(st.st_mtime_ns, st.st_size)
+    return os.path.join(cache_dir, '{}-{}.pkl'.format(prefix, version))
+
+
+def _store(df, target):
+    # Entries for older versions of the same sheet are dropped.
+    prefix = os.path.basename(target).split('-')[0] + '-'
+    directory = os.path.dirname(target)
+    for name in os.listdir(directory):
+        if name.startswith(prefix):
+            os.remove(os.path.join(directory, name))
+    tmp = '{}.{}.tmp'.format(target, os.getpid())
+    df.to_pickle(tmp)
+    os.replace(tmp, target)
+
+
+def _parse_sheet(path, sheet, kwargs, target):
+    df = pd.read_excel(path, sheet_name=sheet, **kwargs)
+    _store(df, target)
+    return df
+
+
+def _sheet_names(path, cache_dir):
+    target = _cache_path(cache_dir, path, None, {})
+    if os.path.exists(target):
+        return pd.read_pickle(target).tolist()
+    with pd.ExcelFile(path) as book:
+        names = book.sheet_names
+    _store(pd.Series(names, dtype=object), target)
+    return names
+
+
+def read_excel_cached(path, sheet_name=0, cache_dir=None, max_workers=None,
+                      **kwargs):
+    """Read a workbook like ``pd.read_excel``, caching each parsed sheet.
+
+    Parameters
+    ----------
+    path : str
+        Workbook path.
+    sheet_name : str, int, list or None, default 0
+        As for ``pd.read_excel``: a single sheet returns a DataFrame, a list
+        or None (all sheets) returns a dict keyed like ``pd.read_excel``.
+    cache_dir : str, optional
+        Defaults to ``~/.cache/marketdata/sheets``.
+    max_workers : int, optional
+        Processes used to parse uncached sheets of a multi-sheet read.
+    **kwargs
+        Passed to ``pd.read_excel``; part of the cache key.
+
+    Returns
+    -------
+    DataFrame or dict of DataFrame
+    """
+    path = os.path.abspath(path)
+    cache_dir = os.path.expanduser(cache_dir or DEFAULT_CACHE_DIR)
+    if not os.path.isdir(cache_dir):
+        os.makedirs(cache_dir, exist_ok=True)
+
+    single = not isinstance(sheet_name, list) and sheet_name is not None
+    if sheet_name is None:
+        sheets = _sheet_names(path, cache_dir)
+    else:
+        sheets = [sheet_name] if single else list(sheet_name)
+
+    frames = {}
+    missing = []
+    for sheet in sheets:
+        target = _cache_path(cache_dir, path, sheet, kwargs)
+        if os.path.exists(target):
+            frames[sheet] = pd.read_pickle(target)
+        else:
+            missing.append((sheet, target))
+
+    if len(missing) == 1:
+        sheet, target = missing[0]
+        frames[sheet] = _parse_sheet(path, sheet, kwargs, target)
+    elif missing:
+        workers = min(max_workers or os.cpu_count() or 1, len(missing))
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [(sheet, pool.submit(_parse_sheet, path, sheet, kwargs,
+                                           target))
+                       for sheet, target in missing]
+            for sheet, fut in futures:
+                frames[sheet] = fut.result()
+
+    if single:
+        return frames[sheet_name]
+    return {sheet: frames[sheet] for sheet in sheets}
@@ -0,0 +1,165 @@
+"""Memory-mapped binary store for dates x tickers float matrices.
+
+The returns matrix used to be saved as CSV (``Alkanza/returns_mine``) or as
+an Excel workbook, and reloading it meant parsing every float back from
+text. A store is a directory holding
+
+``values.f8``
+    the matrix as one contiguous, row-major (C order) float64 block;
+``dates.npy``
+    the ``datetime64[ns]`` row index;
+``meta.json``
+    shape, column labels and index name. Labels that JSON holds as is
+    (str, int, float, bool) read back unchanged; others are stored as
+    their ``str``.
+
+:func:`read_matrix` maps ``values.f8`` into memory and wraps it in a
+DataFrame without copying, so opening a store costs the same whatever its
+size. Row-major layout keeps date ranges contiguous and lets new dates be
+appended at the end of the file.
+"""
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+_VALUES = 'values.f8'
+_DATES = 'dates.npy'
+_META = 'meta.json'
+
+
+def _read_meta(path):
+    with open(os.path.join(path, _META)) as fh:
+        return json.load(fh)
+
+
+def _label(column):
+    """Column label as stored in ``meta.json``."""
+    if isinstance(column, np.generic):
+        column = column.item()
+    if column is None or isinstance(column, (str, int, float, bool)):
+        return column
+    return str(column)
+
+
+def _write_meta(path, meta):
+    tmp = os.path.join(path, _META + '.tmp')
+    with open(tmp, 'w') as fh:
+        json.dump(meta, fh)
+    os.replace(tmp, os.path.join(path, _META))
+
+
+def write_matrix(df, path, chunksize=4096):
+    """Write a date-indexed float frame to a store directory.
+
+    Parameters
+    ----------
+    df : DataFrame
+        Dates x tickers. Values are converted to float64.
+    path : str
+        Store directory; created if missing, overwritten if present.
+    chunksize : int, default 4096
+        Rows converted to C order per write, bounding the temporary copy.
+    """
+    if not os.path.isdir(path):
+        os.makedirs(path)
+    values = df.to_numpy(dtype=np.float64, copy=False)
+    with open(os.path.join(path, _VALUES), 'wb') as fh:
+        for i in range(0, len(values), chunksize):
+            fh.write(np.ascontiguousarray(values[i:i + chunksize]).tobytes())
+    dates = np.asarray(pd.DatetimeIndex(df.index), dtype='datetime64[ns]')
+    np.save(os.path.join(path, _DATES), dates)
+    _write_meta(path, {
+        'rows': int(values.shape[0]),
+        'columns': [_label(c) for c in df.columns],
+        'index_name': df.index.name,
+        'dtype': '<f8',
+    })
+
+
+def append_rows(df, path):
+    """Append rows dated after the store's last date, in place.
+
+    ``df`` is aligned to the store's columns; columns the store does not have
+    raise ``ValueError``, and store columns missing from ``df`` are filled
+    with NaN. Only the new rows of the matrix are written; the history is
+    never read back.
+    """
+    meta = _read_meta(path)
+    labels = meta['columns']
+    known = set(labels)
+    extra = [c for c in df.columns if _label(c) not in known]
+    if extra:
+        raise ValueError('columns not in store: {}'.format(extra))
+    if not len(df):
+        return 0
+    new_dates = np.asarray(pd.DatetimeIndex(df.index), dtype='datetime64[ns]')
+    dates = np.load(os.path.join(path, _DATES))[:meta['rows']]
+    if len(dates) and new_dates[0] <= dates[-1]:
+        raise ValueError('rows must be dated after {}'.format(dates[-1]))
+    if (np.diff(new_dates) <= np.timedelta64(0)).any():
+        raise ValueError('rows must be sorted by date and unique')
+    values = df.set_axis([_label(c) for c in df.columns], axis=1)
+    values = values.reindex(columns=labels).to_numpy(dtype=np.float64)
+
+    # meta.json is written last and its row count is authoritative, so a
+    # failed append leaves the store readable; any partial tail is dropped
+    # here before writing.
+    with open(os.path.join(path, _VALUES), 'r+b') as fh:
+        fh.truncate(meta['rows'] * len(labels) * 8)
+        fh.seek(0, os.SEEK_END)
+        fh.write(np.ascontiguousarray(values).tobytes())
+    tmp = os.path.join(path, _DATES + '.tmp.npy')
+    np.save(tmp, np.concatenate([dates, new_dates]))
+    os.replace(tmp, os.path.join(path, _DATES))
+    meta['rows'] += len(values)
+    _write_meta(path, meta)
+    return len(values)
+
+
+def matrix_info(path):
+    """Return the store's metadata: ``rows``, ``columns`` and ``index_name``."""
+    return _read_meta(path)
+
+
+def read_matrix(path, columns=None, start=None, end=None):
+    """Open a store as a DataFrame, optionally restricted to a subset.
+
+    Parameters
+    ----------
+    path : str
+        Store directory written by :func:`write_matrix`.
+    columns : list, optional
+        Tickers to read. Selecting columns copies just those columns;
+        without it the frame is a read-only view of the mapped file.
+    start, end : str or datetime, optional
+        Inclusive date bounds. Date slicing never copies.
+
+    Returns
+    -------
+    DataFrame
+    """
+    meta = _read_meta(path)
+    labels = meta['columns']
+    rows = meta['rows']
+    dates = np.load(os.path.join(path, _DATES), mmap_mode='r')[:rows]
+    if rows == 0:
+        values = np.empty((0, len(labels)))
+    else:
+        values = np.memmap(os.path.join(path, _VALUES), dtype=meta['dtype'],
+                           mode='r', shape=(rows, len(labels)))
+    lo = 0 if start is None else np.searchsorted(
+        dates, np.datetime64(pd.Timestamp(start), 'ns'), side='left')
+    hi = rows if end is None else np.searchsorted(
+        dates, np.datetime64(pd.Timestamp(end), 'ns'), side='right')
+    values = values[lo:hi]
+    if columns is not None:
+        positions = pd.Index(labels).get_indexer(columns)
+        if (positions < 0).any():
+            missing = [c for c, p in zip(columns, positions) if p < 0]
+            raise KeyError('columns not in store: {}'.format(missing))
+        values = np.asarray(values[:, positions])
+        labels = list(columns)
+    index = pd.DatetimeIndex(np.asarray(dates[lo:hi]), name=meta['index_name'])
+    return pd.DataFrame(values, index=index, columns=labels, copy=False)
@@ -0,0 +1,92 @@
+"""Incremental daily update of the stored price and returns matrices.
+
+The Alkanza job used to recompute every return from ``start = '2015-12-31'``
+on each run. :func:`build_returns` writes the full history once; after that
+:func:`update_returns` fetches only the dates after the last stored row,
+computes their total returns against the last stored prices (including
+dividends that went ex in between) and appends them to both stores::
+
+    build_returns(tickers, '2015-12-31', '2017-01-10', 'px', 'ret')
+    update_returns('px', 'ret', '2017-01-11')
+"""
+import numpy as np
+import pandas as pd
+
+from marketdata.dividends import fetch_dividends
+from marketdata.fetch import fetch_prices
+from marketdata.returns import total_returns
+from marketdata.store import append_rows, matrix_info, read_matrix, write_matrix
+
+
+def build_returns(tickers, start, end, prices_path, returns_path,
+                  field='Close', **fetch_kw):
+    """Fetch the full history and write the price and returns stores.
+
+    ``fetch_kw`` (``backend``, ``cache``, ``max_workers``, ...) is passed to
+    both :func:`~marketdata.fetch.fetch_prices` and
+    :func:`~marketdata.dividends.fetch_dividends`.
+
+    Returns
+    -------
+    errors : ErrorReport
+        Dividend fetch failures; those tickers' returns exclude dividends.
+    """
+    prices = fetch_prices(tickers, start, end, field=field, **fetch_kw)
+    events, errors = fetch_dividends(tickers, start, end, **fetch_kw)
+    write_matrix(prices, prices_path)
+    write_matrix(total_returns(prices, events), returns_path)
+    return errors
+
+
+def update_returns(prices_path, returns_path, end, field='Close',
+                   **fetch_kw):
+    """Append prices and returns for the dates after the last stored row.
+
+    Parameters
+    ----------
+    prices_path, returns_path : str
+        Stores written by :func:`build_returns`, sharing their dates.
+    end : str or datetime
+        Last date to fetch.
+    field : str, default 'Close'
+    **fetch_kw
+        As for :func:`build_returns`.
+
+    Returns
+    -------
+    dict
+        ``rows`` appended, the ``start`` and ``end`` dates fetched and the
+        dividend ``errors`` report.
+
+    Notes
+    -----
+    The first new return is measured from the last stored price row, so a
+    ticker whose last stored price is NaN gets NaN on that first new row.
+    """
+    info = matrix_info(prices_path)
+    if matrix_info(returns_path)['rows'] != info['rows']:
+        raise ValueError('price and returns stores are out of step')
+    if info['rows'] == 0:
+        raise ValueError('store is empty; use build_returns first')
+    tickers = info['columns']
+    last = read_matrix(prices_path).iloc[-1:]
+    last_date = last.index[0]
+    start = last_date + pd.Timedelta(days=1)
+    end = pd.Timestamp(end)
+    result = {'rows': 0, 'start': start, 'end': end, 'errors': None}
+    if end < start:
+        return result
+
+    prices = fetch_prices(tickers, start, end, field=field, **fetch_kw)
+    prices = prices[prices.index > last_date]
+    events, errors = fetch_dividends(tickers, start, end, **fetch_kw)
+    result['errors'] = errors
+    if not len(prices):
+        return result
+
+    prev = pd.Series(np.array(last.iloc[0]), index=tickers)
+    returns = total_returns(prices, events, prev=prev)
+    append_rows(prices, prices_path)
+    append_rows(returns, returns_path)
+    result['rows'] = len(prices)
+    return result
@@ -0,0 +1,36 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+
+def make_prices(n_tickers=5, n_days=60, seed=0, late=True):
+    """Random-walk prices; with ``late`` the last ticker starts late."""
+    rng = np.random.RandomState(seed)
+    dates = pd.bdate_range('2016-01-04', periods=n_days,
+                           name='Date').as_unit('ns')
+    values = 50.0 * np.exp(np.cumsum(rng.normal(0, 0.01,
+                                                (n_days, n_tickers)), axis=0))
+    if late and n_tickers > 1:
+        values[:n_days // 3, -1] = np.nan
+    columns = ['T{}'.format(i) for i in range(n_tickers)]
+    return pd.DataFrame(values, index=dates, columns=columns)
+
+
+def make_long(n_tickers=6, n_days=40, seed=0):
+    """``(Index, Date)``-indexed frame with ``Value`` and ``Returns``."""
+    wide = make_prices(n_tickers, n_days, seed)
+    data = wide.reset_index().melt(id_vars='Date', var_name='Index',
+                                   value_name='Value')
+    data = data.set_index(['Index', 'Date'])
+    data['Returns'] = data.groupby(level='Index')['Value'].pct_change()
+    return data
+
+
+@pytest.fixture
+def prices():
+    return make_prices()
+
+
+@pytest.fixture
+def long_frame():
+    return make_long()
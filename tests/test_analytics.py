@@ -0,0 +1,81 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import make_prices
+from marketdata.analytics import RISK_METRICS, bucketed_corr, risk_report
+
+
+@pytest.fixture
+def returns():
+    """Two years of returns with gaps, a late starter and an empty column."""
+    data = make_prices(n_tickers=6, n_days=520, seed=3).pct_change()
+    data.iloc[100:130, 1] = np.nan
+    data.iloc[::17, 2] = np.nan
+    data['T5'] = np.nan
+    return data
+
+
+@pytest.mark.parametrize('freq, key', [
+    ('year', lambda d: d.year),
+    ('quarter', lambda d: d.to_period('Q'))])
+@pytest.mark.parametrize('shuffle', [False, True])
+def test_bucketed_corr_matches_corrwith(returns, freq, key, shuffle):
+    data = returns.sample(frac=1, random_state=0) if shuffle else returns
+    result = bucketed_corr(data, 'T0', freq=freq)
+    expected = data.groupby(key(data.index)).apply(
+        lambda g: g.corrwith(g['T0'])).sort_index()
+    np.testing.assert_allclose(result.to_numpy(), expected.to_numpy(),
+                               atol=1e-12)
+    assert result['T5'].isna().all()
+
+
+def test_bucketed_corr_with_a_series_benchmark(returns):
+    bench = returns['T0'].iloc[::2].rename('bench')
+    result = bucketed_corr(returns, bench)
+    aligned = returns.assign(bench=bench)
+    expected = aligned.groupby(aligned.index.year).apply(
+        lambda g: g.corrwith(g['bench'])).drop(columns='bench')
+    np.testing.assert_allclose(result.to_numpy(), expected.to_numpy(),
+                               atol=1e-12)
+
+
+def _max_drawdown(r):
+    wealth = (1 + r.dropna()).cumprod()
+    peak = np.maximum(wealth.cummax(), 1.0)
+    return (wealth / peak - 1).min()
+
+
+def test_risk_report_matches_pandas(returns):
+    report = risk_report(returns)
+    assert list(report.columns) == list(RISK_METRICS)
+    for name in returns.columns[:5]:
+        r = returns[name]
+        row = report.loc[name]
+        assert row['start'] == r.first_valid_index()
+        assert row['end'] == r.last_valid_index()
+        assert row['observations'] == r.count()
+        assert row['annual_volatility'] == pytest.approx(
+            r.std() * np.sqrt(252))
+        assert row['total_return'] == pytest.approx(
+            (1 + r.fillna(0)).prod() - 1)
+        assert row['max_drawdown'] == pytest.approx(_max_drawdown(r))
+
+
+def test_risk_report_late_and_empty_columns(returns):
+    report = risk_report(returns)
+    late = returns['T4']
+    assert report.loc['T4', 'start'] == late.first_valid_index()
+    assert report.loc['T4', 'observations'] == late.count()
+    empty = report.loc['T5']
+    assert empty['observations'] == 0
+    assert pd.isna(empty['start']) and pd.isna(empty['end'])
+    assert empty[list(RISK_METRICS[3:])].isna().all()
+
+
+def test_risk_report_on_an_empty_frame(returns):
+    report = risk_report(returns.iloc[:0])
+    assert list(report.index) == list(returns.columns)
+    assert (report['observations'] == 0).all()
+    assert report['start'].isna().all()
+    assert report[list(RISK_METRICS[3:])].isna().all().all()
@@ -0,0 +1,42 @@
+import pandas as pd
+
+from marketdata.cache import PriceCache
+from marketdata.fetch import StubBackend, fetch_prices
+
+
+def _backend(prices, **kwargs):
+    frames = {sym: prices[[sym]].dropna().rename(columns={sym: 'Close'})
+              for sym in prices.columns}
+    return StubBackend(frames, **kwargs)
+
+
+def test_cache_hits_and_tops_up(tmp_path, prices):
+    backend = _backend(prices)
+    cache = PriceCache(str(tmp_path))
+    dates = prices.index
+    first = fetch_prices(['T0'], dates[0], dates[29], backend=backend,
+                         cache=cache)
+    again = fetch_prices(['T0'], dates[0], dates[29], backend=backend,
+                         cache=cache)
+    pd.testing.assert_frame_equal(first, again)
+    assert backend.calls == 1
+    full = fetch_prices(['T0'], dates[0], dates[-1], backend=backend,
+                        cache=cache)
+    pd.testing.assert_frame_equal(full, prices[['T0']], check_freq=False)
+    assert backend.calls == 2
+    assert cache.stats() == {'hits': 1, 'misses': 1, 'topups': 1}
+
+
+def test_unpublished_tail_is_fetched_again(tmp_path, prices):
+    dates = prices.index
+    cache = PriceCache(str(tmp_path))
+    early = _backend(prices.iloc[:40])
+    first = fetch_prices(['T0'], dates[0], dates[40], backend=early,
+                         cache=cache)
+    assert first.index[-1] == dates[39]
+    assert cache.coverage('T0', source='stub')[1] == dates[39]
+    caught_up = _backend(prices)
+    full = fetch_prices(['T0'], dates[0], dates[45], backend=caught_up,
+                        cache=cache)
+    pd.testing.assert_frame_equal(full, prices[['T0']].iloc[:46],
+                                  check_freq=False)
@@ -0,0 +1,72 @@
+import io
+import os
+import subprocess
+import sys
+
+import pandas as pd
+import pytest
+
+import marketdata.dividends
+import marketdata.fetch
+from marketdata.__main__ import main
+from marketdata.fetch import StubBackend
+from marketdata.store import read_matrix, write_matrix
+from marketdata.update import build_returns
+
+
+def test_import_is_lazy():
+    code = ('import sys, marketdata as md; md.read_matrix; '
+            'print(" ".join(sorted(m for m in sys.modules '
+            'if m.split(".")[0] in ("marketdata", "pandas_datareader", '
+            '"xlsxwriter", "openpyxl"))))')
+    out = subprocess.run([sys.executable, '-c', code], check=True,
+                         capture_output=True, text=True,
+                         cwd=os.path.dirname(os.path.dirname(__file__)))
+    assert out.stdout.split() == ['marketdata', 'marketdata.store']
+
+
+@pytest.fixture
+def store(tmp_path, prices):
+    path = str(tmp_path / 'px')
+    write_matrix(prices, path)
+    return path
+
+
+def test_show(store, prices, capsys):
+    main(['show', store, '--columns', 'T1,T3', '--tail', '4'])
+    out = pd.read_csv(io.StringIO(capsys.readouterr().out),
+                      index_col=0, parse_dates=True)
+    pd.testing.assert_frame_equal(out, prices[['T1', 'T3']].tail(4),
+                                  check_freq=False, check_index_type=False)
+
+
+def test_info(store, capsys):
+    main(['info', store])
+    assert capsys.readouterr().out.splitlines() == [
+        'rows: 60', 'columns: 5', 'dates: 2016-01-04 .. 2016-03-25']
+
+
+def test_update(tmp_path, prices, capsys, monkeypatch):
+    frames = {sym: prices[[sym]].dropna().rename(columns={sym: 'Close'})
+              for sym in prices.columns}
+    backend = StubBackend(frames)
+    for module in (marketdata.fetch, marketdata.dividends):
+        monkeypatch.setattr(module, 'YahooBackend', lambda: backend)
+    px, ret = str(tmp_path / 'px'), str(tmp_path / 'ret')
+    dates = prices.index
+    build_returns(list(prices.columns), dates[0], dates[29], px, ret,
+                  backend=backend)
+    main(['update', px, ret, str(dates[-1].date()),
+          '--cache', str(tmp_path / 'cache')])
+    assert capsys.readouterr().out == 'appended 30 row(s)\n'
+    pd.testing.assert_frame_equal(read_matrix(px), prices, check_freq=False)
+
+
+def test_export(tmp_path, store, prices, capsys):
+    out = str(tmp_path / 'csv')
+    main(['export', out, 'px=' + store, '--format', 'csv'])
+    assert capsys.readouterr().out.startswith('60 rows in ')
+    exported = pd.read_csv(os.path.join(out, 'px.csv'), index_col=0,
+                           parse_dates=True)
+    pd.testing.assert_frame_equal(exported, prices, check_freq=False,
+                                  check_index_type=False)
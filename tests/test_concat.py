@@ -0,0 +1,50 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from marketdata.concat import concat_stream
+
+
+@pytest.fixture
+def pieces(prices):
+    """Ragged Series, one per ticker, as a fetch would return them."""
+    return {sym: prices[sym].dropna().iloc[i:]
+            for i, sym in enumerate(prices.columns)}
+
+
+def test_matches_concat(pieces):
+    expected = pd.concat(pieces, axis=1)
+    pd.testing.assert_frame_equal(concat_stream(pieces), expected)
+    pd.testing.assert_frame_equal(
+        concat_stream(iter(pieces.values()), keys=list(pieces)), expected)
+    inner = concat_stream(lambda: iter(pieces.values()), keys=list(pieces),
+                          join='inner')
+    pd.testing.assert_frame_equal(inner,
+                                  pd.concat(pieces, axis=1, join='inner'))
+
+
+def test_frames_get_an_outer_level(pieces):
+    frames = {k: v.to_frame('px').assign(half=v / 2)
+              for k, v in pieces.items()}
+    pd.testing.assert_frame_equal(concat_stream(frames),
+                                  pd.concat(frames, axis=1))
+
+
+@pytest.mark.parametrize('widths', [[1] * 5, [1, 40, 2]])
+def test_index_given_reads_inputs_once(prices, widths):
+    calls = []
+
+    def produce():
+        for i, w in enumerate(widths):
+            calls.append(i)
+            yield pd.DataFrame(np.full((len(prices), w), float(i)),
+                               index=prices.index,
+                               columns=['c{}_{}'.format(i, k)
+                                        for k in range(w)])
+
+    calendar = prices.index[5:]
+    result = concat_stream(produce, index=calendar)
+    expected = pd.concat(list(produce()), axis=1).reindex(calendar)
+    assert calls == list(range(len(widths))) * 2
+    pd.testing.assert_frame_equal(result, expected)
+    assert result.to_numpy().flags.f_contiguous
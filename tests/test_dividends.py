@@ -0,0 +1,25 @@
+import numpy as np
+import pandas as pd
+
+from marketdata.dividends import fetch_dividends
+from marketdata.fetch import StubBackend
+
+
+def _backend(prices, **kwargs):
+    frames = {sym: prices[[sym]].dropna().rename(columns={sym: 'Close'})
+              for sym in prices.columns}
+    return StubBackend(frames, **kwargs)
+
+
+def test_fetch_dividends_reports_failures(prices):
+    dates = prices.index
+    actions = {'T0': pd.DataFrame({'action': ['DIVIDEND', 'SPLIT',
+                                              'DIVIDEND', 'DIVIDEND'],
+                                   'value': [0.1, 2.0, 0.2, 0.05]},
+                                  index=dates[[5, 5, 20, 20]])}
+    backend = _backend(prices, actions=actions)
+    events, errors = fetch_dividends(['T0', 'T1', 'NOPE'], dates[0],
+                                     dates[-1], backend=backend, backoff=0)
+    assert list(events['ticker']) == ['T0', 'T0']
+    np.testing.assert_allclose(events['amount'], [0.1, 0.25])
+    assert errors.symbols == ['NOPE']
@@ -0,0 +1,58 @@
+import os
+
+import pandas as pd
+import pytest
+
+from marketdata.export import export_reports
+from marketdata.store import read_matrix
+
+
+@pytest.fixture
+def reports(prices, long_frame):
+    """A dated matrix with NaN cells, and a frame on (Index, Date) rows."""
+    return {'returns': prices.pct_change(),
+            'long': long_frame.iloc[:50]}
+
+
+def test_xlsx_round_trip(tmp_path, reports):
+    path = str(tmp_path / 'report.xlsx')
+    stats = export_reports(reports, path, chunksize=7)
+    returns = pd.read_excel(path, sheet_name='returns', index_col=0)
+    pd.testing.assert_frame_equal(returns, reports['returns'],
+                                  check_freq=False, check_index_type=False)
+    assert returns.iloc[0].isna().all()
+    long = pd.read_excel(path, sheet_name='long', index_col=[0, 1])
+    pd.testing.assert_frame_equal(long, reports['long'],
+                                  check_index_type=False)
+    assert stats['reports'] == {'returns': 60, 'long': 50}
+
+
+def test_csv_round_trip(tmp_path, reports):
+    path = str(tmp_path / 'csv')
+    export_reports(reports, path, chunksize=7)
+    returns = pd.read_csv(os.path.join(path, 'returns.csv'), index_col=0,
+                          parse_dates=True)
+    pd.testing.assert_frame_equal(returns, reports['returns'],
+                                  check_freq=False, check_index_type=False)
+    long = pd.read_csv(os.path.join(path, 'long.csv'), index_col=[0, 1],
+                       parse_dates=['Date'])
+    pd.testing.assert_frame_equal(long, reports['long'],
+                                  check_index_type=False)
+
+
+def test_binary_round_trip(tmp_path, reports):
+    path = str(tmp_path / 'bin')
+    export_reports(reports, path, fmt='binary')
+    pd.testing.assert_frame_equal(read_matrix(os.path.join(path, 'returns')),
+                                  reports['returns'], check_freq=False)
+    pd.testing.assert_frame_equal(
+        pd.read_pickle(os.path.join(path, 'long.pkl')), reports['long'])
+
+
+def test_stats(tmp_path, reports):
+    stats = export_reports(reports, str(tmp_path / 'csv'))
+    assert stats['rows'] == 110
+    assert stats['reports'] == {'returns': 60, 'long': 50}
+    assert stats['rows_per_sec'] * stats['seconds'] == pytest.approx(110)
+    with pytest.raises(ValueError):
+        export_reports(reports, str(tmp_path / 'x'), fmt='parquet')
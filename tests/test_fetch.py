@@ -0,0 +1,44 @@
+import pandas as pd
+import pytest
+
+from marketdata.fetch import FetchError, StubBackend, fetch_prices, get_px
+
+
+def _backend(prices, **kwargs):
+    frames = {sym: prices[[sym]].dropna().rename(columns={sym: 'Close'})
+              for sym in prices.columns}
+    return StubBackend(frames, **kwargs)
+
+
+def test_fetch_prices_matches_source(prices):
+    backend = _backend(prices)
+    result = fetch_prices(list(prices.columns), prices.index[0],
+                          prices.index[-1], backend=backend, max_workers=3)
+    pd.testing.assert_frame_equal(result, prices, check_freq=False)
+    assert backend.calls == prices.shape[1]
+
+
+def test_fetch_prices_unions_ragged_dates(prices):
+    frames = {'A': prices[['T0']].iloc[::2].rename(columns={'T0': 'Close'}),
+              'B': prices[['T1']].iloc[1::3].rename(columns={'T1': 'Close'})}
+    result = fetch_prices(['A', 'B'], prices.index[0], prices.index[-1],
+                          backend=StubBackend(frames))
+    expected = pd.DataFrame({'A': frames['A']['Close'],
+                             'B': frames['B']['Close']})
+    pd.testing.assert_frame_equal(result, expected, check_freq=False,
+                                  check_names=False)
+
+
+def test_fetch_prices_raises_after_retries(prices):
+    backend = _backend(prices)
+    with pytest.raises(FetchError) as info:
+        fetch_prices(['T0', 'NOPE'], prices.index[0], prices.index[-1],
+                     backend=backend, retries=2, backoff=0)
+    assert list(info.value.failures) == ['NOPE']
+    assert backend.calls == 1 + 3
+
+
+def test_get_px(prices):
+    px = get_px('T1', prices.index[0], prices.index[-1], field='Close',
+                backend=_backend(prices))
+    pd.testing.assert_series_equal(px, prices['T1'], check_freq=False)
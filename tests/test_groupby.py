@@ -0,0 +1,169 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from marketdata.groupby import (GroupPlan, calendar_reduce, fused_agg,
+                                group_plan, grouped_diff, grouped_every,
+                                grouped_head, grouped_nth, grouped_pct_change,
+                                grouped_shift, grouped_tail, weighted_agg)
+from marketdata.periods import CalendarKey, bucket_codes
+
+
+@pytest.fixture
+def shuffled(long_frame):
+    """Long frame with interleaved groups and a weight column."""
+    rng = np.random.RandomState(1)
+    data = long_frame.sample(frac=1, random_state=rng)
+    data['w'] = rng.uniform(0.5, 2.0, len(data))
+    return data
+
+
+def test_weighted_mean_and_var(shuffled):
+    result = weighted_agg(shuffled, 'Value', 'w', how=['mean', 'var'],
+                          level='Index')
+
+    def reference(g):
+        g = g.dropna(subset=['Value'])
+        mean = np.average(g['Value'], weights=g['w'])
+        var = np.average((g['Value'] - mean) ** 2, weights=g['w'])
+        return pd.Series({('Value', 'mean'): mean, ('Value', 'var'): var})
+
+    expected = shuffled.groupby(level='Index').apply(reference)
+    np.testing.assert_allclose(result.to_numpy(), expected.to_numpy())
+
+
+@pytest.mark.parametrize('func, method', [
+    (grouped_shift, 'shift'), (grouped_diff, 'diff'),
+    (grouped_pct_change, 'pct_change')])
+@pytest.mark.parametrize('periods', [1, 3, -2])
+def test_lagged_kernels(shuffled, func, method, periods):
+    result = func(shuffled, 'Value', periods=periods, level='Index')
+    grouped = shuffled.groupby(level='Index')['Value']
+    expected = getattr(grouped, method)(periods=periods)
+    pd.testing.assert_series_equal(result, expected, check_names=False)
+
+
+def test_lagged_by_order_column(shuffled):
+    data = shuffled.reset_index()
+    result = grouped_diff(data, 'Value', by='Index', order='Date')
+    expected = (data.sort_values('Date').groupby('Index')['Value'].diff()
+                .reindex(data.index))
+    pd.testing.assert_series_equal(result, expected, check_names=False)
+
+
+def test_positional_selection(shuffled):
+    grouped = shuffled.groupby(level='Index')
+    pd.testing.assert_frame_equal(grouped_head(shuffled, 3, level='Index'),
+                                  grouped.head(3))
+    pd.testing.assert_frame_equal(grouped_tail(shuffled, 2, level='Index'),
+                                  grouped.tail(2))
+    pd.testing.assert_frame_equal(grouped_nth(shuffled, [0, -1],
+                                              level='Index'),
+                                  grouped.nth([0, -1]))
+    every = grouped_every(shuffled, 5, level='Index')
+    expected = shuffled[grouped.cumcount().to_numpy() % 5 == 0]
+    pd.testing.assert_frame_equal(every, expected)
+
+
+def test_fused_agg_matches_agg(shuffled):
+    spec = {'Returns': ['min', 'max', 'std', 'mean', 'count'],
+            'Value': ['mean', 'sum', 'var', 'first', 'last']}
+    grouped = shuffled.groupby(level='Index')
+    pd.testing.assert_frame_equal(fused_agg(grouped, spec), grouped.agg(spec),
+                                  check_dtype=False)
+
+
+def test_fused_agg_falls_back_for_other_stats(shuffled):
+    grouped = shuffled.groupby(level='Index')
+    spec = {'Value': ['mean', 'median']}
+    pd.testing.assert_frame_equal(fused_agg(grouped, spec), grouped.agg(spec),
+                                  check_dtype=False)
+
+
+def test_fused_agg_falls_back_with_calendar_key(prices):
+    result = fused_agg(prices, ['mean', 'median'], by='year')
+    expected = prices.groupby(prices.index.year).agg(['mean', 'median'])
+    np.testing.assert_allclose(result.to_numpy(), expected.to_numpy())
+
+
+def test_fused_agg_falls_back_with_dropped_rows(shuffled):
+    data = shuffled.reset_index()
+    data.loc[data.index[::7], 'Index'] = None
+    spec = {'Value': ['mean', 'median']}
+    result = fused_agg(data, spec, by='Index')
+    expected = data.groupby('Index').agg(spec)
+    pd.testing.assert_frame_equal(result, expected, check_dtype=False,
+                                  check_names=False)
+
+
+@pytest.mark.parametrize('sort', [True, False])
+@pytest.mark.parametrize('level', ['Index', 'Date'])
+def test_level_plan_matches_groupby(shuffled, level, sort):
+    # Unsorted level labels, some of them unused after the slice.
+    data = shuffled.iloc[len(shuffled) // 3:]
+    data.index = data.index.set_levels(
+        data.index.levels[0][::-1], level=0, verify_integrity=False)
+    for index in (data.index, data.index.get_level_values(level)):
+        frame = data.set_axis(index)
+        lvl = level if index.nlevels > 1 else 0
+        plan = GroupPlan.from_level(index, lvl, sort=sort)
+        expected = GroupPlan.from_groupby(frame.groupby(level=lvl,
+                                                        sort=sort))
+        np.testing.assert_array_equal(plan.codes, expected.codes)
+        pd.testing.assert_index_equal(plan.keys, expected.keys)
+
+
+def test_fused_agg_count_on_empty_frame(long_frame):
+    result = fused_agg(long_frame.iloc[:0], {'Value': ['count', 'mean']},
+                       level='Index')
+    expected = long_frame.iloc[:0].groupby(level='Index').agg(
+        {'Value': ['count', 'mean']})
+    assert result[('Value', 'count')].dtype.kind == 'i'
+    assert len(result) == len(expected) == 0
+
+
+def test_level_plans_are_cached(long_frame):
+    _, plan = group_plan(long_frame, level='Index')
+    assert group_plan(long_frame.groupby(level='Index'))[1] is plan
+
+
+def test_level_plans_follow_renamed_levels(long_frame):
+    data = long_frame.copy()
+    fused_agg(data, 'mean', level='Index')
+    data.index.names = ['Date', 'Index']
+    result = fused_agg(data, 'mean', level='Index')
+    pd.testing.assert_frame_equal(result,
+                                  data.groupby(level='Index').mean())
+
+
+@pytest.mark.parametrize('freq, key', [
+    ('year', lambda d: d.year),
+    ('month', lambda d: d.to_period('M')),
+    ('weekday', lambda d: d.weekday)])
+def test_calendar_reduce(prices, freq, key):
+    result = calendar_reduce(prices, freq, how=['mean', 'std'])
+    expected = prices.groupby(key(prices.index)).agg(['mean', 'std'])
+    np.testing.assert_allclose(result.to_numpy(), expected.to_numpy())
+
+
+def test_calendar_key_on_a_column_is_not_aggregated(prices):
+    data = prices.reset_index()
+    result = fused_agg(data, 'mean', by=CalendarKey('year', on='Date'))
+    expected = data.drop(columns='Date').groupby(data['Date'].dt.year).mean()
+    np.testing.assert_allclose(result.to_numpy(), expected.to_numpy())
+    assert list(result.columns) == list(prices.columns)
+
+
+def test_undated_rows_belong_to_no_bucket(prices):
+    dates = prices.index.to_numpy().copy()
+    dates[[3, 40]] = np.datetime64('NaT')
+    data = prices.set_axis(pd.DatetimeIndex(dates, name='Date'))
+    codes, labels = bucket_codes(data.index, 'month')
+    assert (codes[[3, 40]] == -1).all()
+    expected = data.groupby(data.index.to_period('M')).mean()
+    for result in (fused_agg(data, 'mean', by='month'),
+                   calendar_reduce(data, 'month')):
+        pd.testing.assert_frame_equal(result, expected, check_names=False)
+    keys = CalendarKey('month').keys(data)
+    assert keys[[3, 40]].isna().all()
+
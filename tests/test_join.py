@@ -0,0 +1,92 @@
+import gc
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from marketdata.join import (_ALIGN, align_plan, aligned_op, join_indexers,
+                             ordered_align, ordered_join)
+
+
+@pytest.fixture
+def pair(prices):
+    """Overlapping frames: every other day, and a later, shifted range."""
+    left = prices.iloc[::2, :3]
+    right = prices.iloc[10:, 2:].rename(columns=lambda c: c + 'r') * 2
+    return left, right
+
+
+@pytest.mark.parametrize('how', ['inner', 'outer', 'left', 'right'])
+@pytest.mark.parametrize('shuffle', [False, True])
+def test_ordered_join_matches_join(pair, how, shuffle):
+    left, right = pair
+    if shuffle:
+        right = right.sample(frac=1, random_state=0)
+    result, path = ordered_join(left, right, how=how, report=True)
+    pd.testing.assert_frame_equal(result, left.join(right, how=how))
+    assert path == ('hash' if shuffle else 'merge')
+
+
+def test_ordered_align_and_aligned_op(pair):
+    left, right = pair[0]['T2'], pair[1]['T2r']
+    for got, expected in zip(ordered_align(left, right),
+                             left.align(right, join='outer')):
+        pd.testing.assert_series_equal(got, expected)
+    pd.testing.assert_series_equal(aligned_op(left, right, 'add',
+                                              fill_value=0),
+                                   left.add(right, fill_value=0))
+
+
+def test_mixed_date_units_take_the_merge_path(pair):
+    left, right = pair
+    right = right.set_axis(right.index.as_unit('us'))
+    result, path = ordered_join(left, right, how='outer', report=True)
+    pd.testing.assert_frame_equal(result, left.join(right, how='outer'))
+    assert path == 'merge'
+
+
+def _asof_reference(left, right, tolerance=None):
+    right = right.as_unit(left.unit)
+    if tolerance is not None:
+        tolerance = pd.Timedelta(tolerance)
+    probe = pd.merge_asof(
+        pd.DataFrame({'key': left, 'at': np.arange(len(left))})
+        .sort_values('key'),
+        pd.DataFrame({'key': right, 'pos': np.arange(len(right))})
+        .sort_values('key', kind='stable'),
+        on='key', tolerance=tolerance).sort_values('at')
+    return probe['pos'].fillna(-1).to_numpy().astype(np.intp)
+
+
+@pytest.mark.parametrize('tolerance', [None, pd.Timedelta('3D'), '3D'])
+@pytest.mark.parametrize('shuffle', [False, True])
+def test_asof(prices, tolerance, shuffle):
+    left = prices.index[1::2]
+    right = prices.index[::5].as_unit('us')
+    if shuffle:
+        rng = np.random.RandomState(0)
+        left, right = left[rng.permutation(len(left))], \
+            right[rng.permutation(len(right))]
+    index, lidx, ridx, path = join_indexers(left, right, how='asof',
+                                            tolerance=tolerance)
+    assert index is left
+    np.testing.assert_array_equal(lidx, np.arange(len(left)))
+    np.testing.assert_array_equal(ridx,
+                                  _asof_reference(left, right, tolerance))
+    assert path == ('hash' if shuffle else 'merge')
+
+
+def test_align_plans_go_with_either_index(prices):
+    left = prices.index[::2]
+    right = prices.index[::3]
+    plan = align_plan(left, right)
+    assert align_plan(left, right) is plan
+    assert (id(right), 'outer') in _ALIGN[id(left)]
+    key = (id(right), 'outer')
+    del right
+    gc.collect()
+    assert key not in _ALIGN[id(left)]
+    ident = id(left)
+    del left
+    gc.collect()
+    assert ident not in _ALIGN
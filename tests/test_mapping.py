@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from marketdata.mapping import map_categorical
+
+MEAT_TO_ANIMAL = {'bacon': 'pig', 'pulled pork': 'pig', 'pastrami': 'cow',
+                  'corned beef': 'cow', 'honey ham': 'pig',
+                  'nova lox': 'salmon'}
+
+
+@pytest.fixture
+def food():
+    values = ['bacon', 'pulled pork', 'Bacon', 'Pastrami', 'corned beef',
+              'Bacon', 'pastrami', 'honey ham', 'nova lox', 'tofu', None]
+    return pd.Series(values * 3, index=np.arange(33)[::-1], name='food')
+
+
+def _check(result, expected):
+    assert isinstance(result.dtype, pd.CategoricalDtype)
+    pd.testing.assert_series_equal(result.astype(object),
+                                   expected.astype(object))
+
+
+@pytest.mark.parametrize('normalize', ['lower', str.lower])
+def test_matches_series_map(food, normalize):
+    result = map_categorical(food, MEAT_TO_ANIMAL, normalize=normalize)
+    expected = food.str.lower().map(MEAT_TO_ANIMAL)
+    _check(result, expected)
+    assert result[food == 'tofu'].isna().all()
+
+
+def test_mapper_forms(food):
+    expected = food.map(MEAT_TO_ANIMAL)
+    _check(map_categorical(food, pd.Series(MEAT_TO_ANIMAL)), expected)
+    _check(map_categorical(food, lambda k: MEAT_TO_ANIMAL.get(k)), expected)
+    _check(map_categorical(food, {}), food.map({}))
+    _check(map_categorical(food, normalize='upper'), food.str.upper())
+
+
+def test_categorical_input(food):
+    result = map_categorical(food.astype('category'), MEAT_TO_ANIMAL,
+                             normalize='lower')
+    _check(result, food.str.lower().map(MEAT_TO_ANIMAL))
+
+
+def test_sort(food):
+    result = map_categorical(food, MEAT_TO_ANIMAL, normalize='lower',
+                             sort=True)
+    assert list(result.cat.categories) == ['cow', 'pig', 'salmon']
+    unsorted = map_categorical(food, MEAT_TO_ANIMAL, normalize='lower')
+    assert list(unsorted.cat.categories) == ['pig', 'cow', 'salmon']
+
+
+def test_array_input(food):
+    result = map_categorical(food.tolist(), MEAT_TO_ANIMAL)
+    assert isinstance(result, pd.Categorical)
+    _check(pd.Series(result, index=food.index, name='food'),
+           food.map(MEAT_TO_ANIMAL))
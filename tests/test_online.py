@@ -0,0 +1,71 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from marketdata.online import OnlineCovariance
+
+
+@pytest.fixture
+def returns(prices):
+    return prices.pct_change().iloc[1:]
+
+
+def test_matches_pairwise_cov_and_corr(returns):
+    acc = OnlineCovariance(returns.columns)
+    for lo in range(0, len(returns), 7):
+        acc.update(returns.iloc[lo:lo + 7])
+    pd.testing.assert_frame_equal(acc.cov(), returns.cov())
+    pd.testing.assert_frame_equal(acc.corr(), returns.corr())
+
+
+def test_window_matches_rolling(returns):
+    acc = OnlineCovariance(returns.columns, window=20)
+    acc.update(returns.iloc[:30]).update(returns.iloc[30:])
+    expected = returns.iloc[-20:].cov()
+    pd.testing.assert_frame_equal(acc.cov(), expected)
+
+
+def test_decay_matches_ewm(returns):
+    acc = OnlineCovariance(returns.columns[:2], halflife=10)
+    acc.update(returns.iloc[:, :2])
+    expected = returns.iloc[:, :2].ewm(halflife=10).cov().iloc[-2:]
+    np.testing.assert_allclose(acc.cov().to_numpy(), expected.to_numpy())
+
+
+def test_save_load_keeps_labels(tmp_path, returns):
+    data = returns.copy()
+    data.columns = [101, 102, 103, 104, 105]
+    acc = OnlineCovariance(data.columns)
+    acc.update(data.iloc[:30])
+    path = str(tmp_path / 'state.npz')
+    acc.save(path)
+    loaded = OnlineCovariance.load(path)
+    assert loaded.columns.equals(data.columns)
+    loaded.update(data.iloc[30:])
+    pd.testing.assert_frame_equal(loaded.cov(), data.cov())
+
+
+def test_save_does_not_pickle_by_default(tmp_path, returns):
+    path = str(tmp_path / 'state.npz')
+    acc = OnlineCovariance(returns.columns.rename('ticker'))
+    acc.update(returns)
+    acc.save(path)
+    with np.load(path) as data:
+        assert all(data[name].dtype != object for name in data.files)
+    loaded = OnlineCovariance.load(path)
+    assert loaded.columns.equals(acc.columns)
+    assert loaded.columns.name == 'ticker'
+
+
+def test_pickled_labels_need_opt_in(tmp_path, returns):
+    data = returns.iloc[:, :2].set_axis(
+        pd.MultiIndex.from_tuples([('px', 'A'), ('px', 'B')]), axis=1)
+    acc = OnlineCovariance(data.columns).update(data)
+    path = str(tmp_path / 'state.npz')
+    with pytest.raises(ValueError):
+        acc.save(path)
+    acc.save(path, allow_pickle=True)
+    with pytest.raises(ValueError):
+        OnlineCovariance.load(path)
+    loaded = OnlineCovariance.load(path, allow_pickle=True)
+    pd.testing.assert_frame_equal(loaded.cov(), acc.cov())
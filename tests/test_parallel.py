@@ -0,0 +1,44 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from marketdata.parallel import parallel_apply
+
+
+def fit(group):
+    x = np.arange(len(group), dtype=float)
+    slope, intercept = np.polyfit(x, group['Value'].to_numpy(), 1)
+    return pd.Series({'slope': slope, 'intercept': intercept})
+
+
+def last_return(group):
+    return group.iloc[-1]
+
+
+def nothing(group):
+    return None
+
+
+@pytest.mark.parametrize('max_workers', [1, 2])
+def test_series_results_match_apply(long_frame, max_workers):
+    result = parallel_apply(long_frame, fit, level='Index',
+                            max_workers=max_workers)
+    expected = long_frame.groupby(level='Index').apply(fit)
+    pd.testing.assert_frame_equal(result, expected)
+
+
+@pytest.mark.parametrize('max_workers', [1, 2])
+def test_scalar_results_on_a_column(long_frame, max_workers):
+    result = parallel_apply(long_frame, last_return, level='Index',
+                            columns='Returns', max_workers=max_workers)
+    expected = long_frame.groupby(level='Index')['Returns'].apply(
+        last_return)
+    pd.testing.assert_series_equal(result, expected, check_names=False)
+
+
+@pytest.mark.parametrize('max_workers', [1, 2])
+def test_all_none_results(long_frame, max_workers):
+    result = parallel_apply(long_frame, nothing, level='Index',
+                            max_workers=max_workers)
+    assert len(result) == 0
+    assert result.index.name == 'Index'
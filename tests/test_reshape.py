@@ -0,0 +1,50 @@
+import numpy as np
+import pandas as pd
+
+from marketdata.groupby import fused_agg, group_plan
+from marketdata.reshape import LongView, to_wide
+
+
+def _melted(wide):
+    return pd.melt(wide.reset_index(), id_vars='Date', var_name='Index',
+                   value_name='Value').set_index(['Index', 'Date'])
+
+
+def test_matches_melt(prices):
+    view = LongView(prices)
+    expected = _melted(prices)
+    pd.testing.assert_frame_equal(view.to_frame(), expected)
+    pd.testing.assert_series_equal(view.to_series(), expected['Value'])
+    assert np.shares_memory(view.values, prices.to_numpy())
+
+
+def test_round_trips_without_reshaping(prices):
+    view = LongView(prices)
+    for obj in (view, view.to_series(), view.to_frame()):
+        pd.testing.assert_frame_equal(to_wide(obj), prices)
+    unrelated = _melted(prices)['Value']
+    pd.testing.assert_frame_equal(
+        to_wide(unrelated), unrelated.unstack(level=0).rename_axis(
+            columns='Index'), check_freq=False)
+
+
+def test_level_groupby_uses_the_view_plans(prices):
+    view = LongView(prices)
+    series = view.to_series()
+    for level in ('Index', 'Date'):
+        _, plan = group_plan(series, level=level)
+        assert plan is group_plan(series.groupby(level=level))[1]
+        grouped = series.groupby(level=level)
+        pd.testing.assert_frame_equal(fused_agg(grouped, ['mean', 'std']),
+                                      grouped.agg(['mean', 'std']))
+        pd.testing.assert_series_equal(fused_agg(grouped, 'max'),
+                                       grouped.max())
+
+
+def test_unsorted_columns(prices):
+    wide = prices[prices.columns[::-1]]
+    series = LongView(wide).to_series()
+    grouped = series.groupby(level='Index')
+    pd.testing.assert_frame_equal(fused_agg(grouped, ['mean', 'count']),
+                                  grouped.agg(['mean', 'count']),
+                                  check_dtype=False)
@@ -0,0 +1,64 @@
+import numpy as np
+import pandas as pd
+
+from marketdata.returns import total_returns
+
+
+def _reference(prices, dividends):
+    """The notebook's formula, with NaN wherever a price is missing."""
+    div = dividends.pivot_table(index='date', columns='ticker',
+                                values='amount', aggfunc='sum',
+                                observed=True)
+    div = div.reindex(index=prices.index, columns=prices.columns).fillna(0)
+    prev = prices.shift(1)
+    return (prices - prev + div) / prev
+
+
+def _dividends(prices, rows, tickers, amounts):
+    return pd.DataFrame({'date': prices.index[rows], 'ticker': tickers,
+                         'amount': amounts})
+
+
+def test_matches_reference(prices):
+    divs = _dividends(prices, [5, 5, 30, 30], ['T0', 'T0', 'T2', 'T4'],
+                      [0.1, 0.2, 0.3, 0.4])
+    pd.testing.assert_frame_equal(total_returns(prices, divs),
+                                  _reference(prices, divs))
+
+
+def test_without_dividends(prices):
+    pd.testing.assert_frame_equal(total_returns(prices),
+                                  prices / prices.shift(1) - 1,
+                                  check_exact=False, rtol=1e-12)
+
+
+def test_holiday_ex_date_rolls_forward(prices):
+    holiday = prices.index[10] - pd.Timedelta(days=1)
+    while holiday in prices.index:
+        holiday -= pd.Timedelta(days=1)
+    divs = pd.DataFrame({'date': [holiday], 'ticker': ['T1'],
+                         'amount': [0.5]})
+    moved = _dividends(prices, [10], ['T1'], [0.5])
+    pd.testing.assert_frame_equal(total_returns(prices, divs),
+                                  _reference(prices, moved))
+
+
+def test_prev_gives_first_row(prices):
+    prev = prices.iloc[0] * 0.99
+    divs = pd.DataFrame({'date': [prices.index[0] - pd.Timedelta(days=3)],
+                         'ticker': ['T0'], 'amount': [0.2]})
+    result = total_returns(prices.iloc[1:], divs, prev=prices.iloc[0])
+    expected = total_returns(prices, None).iloc[1:]
+    expected.iloc[0, 0] += 0.2 / prices.iloc[0, 0]
+    pd.testing.assert_frame_equal(result, expected)
+    first = total_returns(prices, prev=prev).iloc[0]
+    np.testing.assert_allclose(first, prices.iloc[0] / prev - 1)
+
+
+def test_skip_bridges_gaps(prices):
+    gappy = prices.copy()
+    gappy.iloc[10:13, 0] = np.nan
+    result = total_returns(gappy, missing='skip')
+    bridged = gappy['T0'].dropna()
+    expected = (bridged / bridged.shift(1) - 1).reindex(gappy.index)
+    pd.testing.assert_series_equal(result['T0'], expected)
@@ -0,0 +1,75 @@
+import os
+
+import pandas as pd
+import pytest
+
+from marketdata import sheets
+from marketdata.sheets import read_excel_cached
+
+
+@pytest.fixture
+def workbook(tmp_path, prices):
+    path = str(tmp_path / 'book.xlsx')
+    with pd.ExcelWriter(path) as writer:
+        pd.DataFrame({'Ticker': list(prices.columns)}).to_excel(
+            writer, sheet_name='tickers', index=False)
+        prices.to_excel(writer, sheet_name='prices')
+        prices.iloc[:5].to_excel(writer, sheet_name='head')
+    return path
+
+
+@pytest.fixture
+def parses(monkeypatch):
+    """Count in-process ``pd.read_excel`` calls."""
+    calls = []
+    read_excel = pd.read_excel
+
+    def counting(*args, **kwargs):
+        calls.append(kwargs.get('sheet_name'))
+        return read_excel(*args, **kwargs)
+
+    monkeypatch.setattr(sheets.pd, 'read_excel', counting)
+    return calls
+
+
+def test_hit_and_miss(tmp_path, workbook, parses):
+    cache = str(tmp_path / 'cache')
+    first = read_excel_cached(workbook, 'tickers', cache_dir=cache)
+    again = read_excel_cached(workbook, 'tickers', cache_dir=cache)
+    pd.testing.assert_frame_equal(first, again)
+    pd.testing.assert_frame_equal(
+        first, pd.read_excel(workbook, sheet_name='tickers'))
+    assert parses == ['tickers', 'tickers']  # one parse, one reference read
+    read_excel_cached(workbook, 'tickers', cache_dir=cache, index_col=0)
+    assert len(parses) == 3  # kwargs are part of the key
+
+
+def test_invalidated_by_mtime_and_size(tmp_path, workbook, parses):
+    cache = str(tmp_path / 'cache')
+    read_excel_cached(workbook, 'head', cache_dir=cache)
+    st = os.stat(workbook)
+    os.utime(workbook, ns=(st.st_atime_ns, st.st_mtime_ns + 10 ** 9))
+    read_excel_cached(workbook, 'head', cache_dir=cache)
+    assert len(parses) == 2
+    with pd.ExcelWriter(workbook) as writer:
+        pd.DataFrame({'x': range(100)}).to_excel(writer, sheet_name='head')
+    result = read_excel_cached(workbook, 'head', cache_dir=cache)
+    assert len(parses) == 3
+    assert len(result) == 100
+    # Entries for older versions are dropped.
+    assert len([n for n in os.listdir(cache) if n.endswith('.pkl')]) == 1
+
+
+def test_all_sheets_in_parallel(tmp_path, workbook, parses):
+    cache = str(tmp_path / 'cache')
+    expected = pd.read_excel(workbook, sheet_name=None)
+    result = read_excel_cached(workbook, sheet_name=None, cache_dir=cache,
+                               max_workers=2)
+    assert list(result) == list(expected)
+    for name in expected:
+        pd.testing.assert_frame_equal(result[name], expected[name])
+    del parses[:]
+    cached = read_excel_cached(workbook, sheet_name=['prices', 'tickers'],
+                               cache_dir=cache)
+    assert parses == []
+    pd.testing.assert_frame_equal(cached['prices'], expected['prices'])
@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from marketdata.store import (append_rows, matrix_info, read_matrix,
+                              write_matrix)
+
+
+def test_round_trip(tmp_path, prices):
+    path = str(tmp_path / 'ret')
+    write_matrix(prices, path, chunksize=7)
+    result = read_matrix(path)
+    pd.testing.assert_frame_equal(result, prices, check_freq=False)
+    assert not result.to_numpy().flags.writeable
+    assert matrix_info(path)['rows'] == len(prices)
+
+
+def test_slicing(tmp_path, prices):
+    path = str(tmp_path / 'ret')
+    write_matrix(prices, path)
+    dates = prices.index
+    pd.testing.assert_frame_equal(
+        read_matrix(path, columns=['T3', 'T1'], start=dates[5],
+                    end=dates[20]),
+        prices.loc[dates[5]:dates[20], ['T3', 'T1']], check_freq=False)
+    pd.testing.assert_frame_equal(read_matrix(path, start='2030-01-01'),
+                                  prices.iloc[:0], check_freq=False)
+    with pytest.raises(KeyError):
+        read_matrix(path, columns=['T1', 'NOPE'])
+
+
+def test_int_labels_are_kept(tmp_path, prices):
+    path = str(tmp_path / 'ret')
+    data = prices.set_axis(np.arange(101, 101 + prices.shape[1]), axis=1)
+    write_matrix(data, path)
+    pd.testing.assert_frame_equal(read_matrix(path), data, check_freq=False)
+    pd.testing.assert_frame_equal(read_matrix(path, columns=[101]),
+                                  data[[101]], check_freq=False)
+
+
+def test_append_rows(tmp_path, prices):
+    path = str(tmp_path / 'ret')
+    write_matrix(prices.iloc[:30], path)
+    assert append_rows(prices.iloc[30:45], path) == 15
+    # Columns missing from the new rows are filled with NaN.
+    tail = prices.iloc[45:].drop(columns='T2')
+    assert append_rows(tail, path) == len(tail)
+    expected = prices.copy()
+    expected.iloc[45:, 2] = np.nan
+    pd.testing.assert_frame_equal(read_matrix(path), expected,
+                                  check_freq=False)
+
+
+def test_append_rejects_bad_rows(tmp_path, prices):
+    path = str(tmp_path / 'ret')
+    write_matrix(prices.iloc[:30], path)
+    with pytest.raises(ValueError):
+        append_rows(prices.iloc[20:40], path)
+    with pytest.raises(ValueError):
+        append_rows(prices.iloc[30:40].assign(NEW=1.0), path)
+    with pytest.raises(ValueError):
+        append_rows(prices.iloc[30:40].iloc[::-1], path)
+    assert matrix_info(path)['rows'] == 30
+
+
+def test_empty_store(tmp_path, prices):
+    path = str(tmp_path / 'ret')
+    write_matrix(prices.iloc[:0], path)
+    pd.testing.assert_frame_equal(read_matrix(path), prices.iloc[:0],
+                                  check_freq=False, check_index_type=False)
+    append_rows(prices.iloc[:10], path)
+    pd.testing.assert_frame_equal(read_matrix(path), prices.iloc[:10],
+                                  check_freq=False)
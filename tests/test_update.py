@@ -0,0 +1,68 @@
+import pandas as pd
+
+from marketdata.cache import PriceCache
+from marketdata.fetch import StubBackend
+from marketdata.store import read_matrix
+from marketdata.update import build_returns, update_returns
+
+
+def _backend(prices):
+    frames = {sym: prices[[sym]].dropna().rename(columns={sym: 'Close'})
+              for sym in prices.columns}
+    dates = prices.index
+    actions = {sym: pd.DataFrame({'action': ['DIVIDEND', 'DIVIDEND'],
+                                  'value': [0.2, 0.3]},
+                                 index=dates[[15 + i, 45 + i]])
+               for i, sym in enumerate(prices.columns[:3])}
+    return StubBackend(frames, actions=actions)
+
+
+def test_update_matches_full_rebuild(tmp_path, prices):
+    backend = _backend(prices)
+    tickers = list(prices.columns)
+    dates = prices.index
+    kw = dict(backend=backend, backoff=0)
+    build_returns(tickers, dates[0], dates[-1], str(tmp_path / 'px_full'),
+                  str(tmp_path / 'ret_full'), **kw)
+    build_returns(tickers, dates[0], dates[29], str(tmp_path / 'px'),
+                  str(tmp_path / 'ret'), **kw)
+    update_returns(str(tmp_path / 'px'), str(tmp_path / 'ret'), dates[44],
+                   **kw)
+    result = update_returns(str(tmp_path / 'px'), str(tmp_path / 'ret'),
+                            dates[-1], **kw)
+    assert result['rows'] == len(dates) - 45
+    for name in ('px', 'ret'):
+        pd.testing.assert_frame_equal(
+            read_matrix(str(tmp_path / name)),
+            read_matrix(str(tmp_path / (name + '_full'))), check_freq=False)
+
+
+def test_update_is_noop_when_current(tmp_path, prices):
+    backend = _backend(prices)
+    dates = prices.index
+    build_returns(list(prices.columns), dates[0], dates[-1],
+                  str(tmp_path / 'px'), str(tmp_path / 'ret'),
+                  backend=backend)
+    result = update_returns(str(tmp_path / 'px'), str(tmp_path / 'ret'),
+                            dates[-1], backend=backend)
+    assert result['rows'] == 0
+    assert len(read_matrix(str(tmp_path / 'px'))) == len(dates)
+
+
+def test_update_refetches_dates_not_yet_published(tmp_path, prices):
+    dates = prices.index
+    tickers = list(prices.columns)
+    cache = PriceCache(str(tmp_path / 'cache'))
+    build_returns(tickers, dates[0], dates[-1], str(tmp_path / 'px_full'),
+                  str(tmp_path / 'ret_full'), backend=_backend(prices))
+    early = _backend(prices)
+    early.frames = {sym: frame.loc[:dates[39]]
+                    for sym, frame in early.frames.items()}
+    build_returns(tickers, dates[0], dates[40], str(tmp_path / 'px'),
+                  str(tmp_path / 'ret'), backend=early, cache=cache)
+    update_returns(str(tmp_path / 'px'), str(tmp_path / 'ret'), dates[-1],
+                   backend=_backend(prices), cache=cache)
+    for name in ('px', 'ret'):
+        pd.testing.assert_frame_equal(
+            read_matrix(str(tmp_path / name)),
+            read_matrix(str(tmp_path / (name + '_full'))), check_freq=False)